@@ -1,19 +1,61 @@
 #version 1.0
-from collections import deque
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from itertools import accumulate, islice
+from operator import itemgetter
 from unittest import result
-from benchmark import run_benchmark
-from flask import Flask, render_template, request, redirect, url_for
+from benchmark_jobs import JOB_KINDS, BenchmarkJobs
+from bulk_io import detect_format, export_chunks, validate_contact, validate_upload
+from metrics import ENABLED as METRICS_ENABLED, gauge, instrument_app, render as render_metrics, timed
+from sorting import sort_contacts
+from records import Contact, categories, category_names
+from shared_state import shared_log_from_env
+from snapshot_store import SnapshotData, SnapshotStore, encode_snapshot, parse_snapshot
+from storage import WriteBehindQueue, backend_from_env
+from markupsafe import Markup
+from flask import Flask, Response, abort, jsonify, make_response, render_template, stream_template, request, redirect, url_for
+import atexit
+import functools
+import gc
+import os
+import sys
 import time
 import heapq
+import math
+import threading
 
 app = Flask(__name__)
 app.config['FLASK_TITLE'] = ""
+# When enabled, every write is followed by a full rebuild comparison so any
+# drift between the linked list and the incrementally maintained indexes is caught.
+app.config['CONSISTENCY_CHECK'] = os.getenv('CONSISTENCY_CHECK', '0') == '1'
+# Undo history limits: number of undoable writes, and an approximate memory cap
+# (bytes) for all recorded operations across undo_stack and redo_queue.
+app.config['UNDO_HISTORY_DEPTH'] = int(os.getenv('UNDO_HISTORY_DEPTH', '100'))
+app.config['UNDO_MEMORY_LIMIT'] = int(os.getenv('UNDO_MEMORY_LIMIT', str(16 * 1024 * 1024)))
+# Page size for the contact list (?page=/?after= select the page, ?per_page= overrides),
+# and whether pages are streamed in chunks by default (?stream=1 enables it per request).
+app.config['CONTACTS_PER_PAGE'] = int(os.getenv('CONTACTS_PER_PAGE', '100'))
+app.config['MAX_CONTACTS_PER_PAGE'] = 1000
+app.config['TREE_CONTACTS_PER_NODE'] = int(os.getenv('TREE_CONTACTS_PER_NODE', '25'))
+app.config['VIP_PANEL_SIZE'] = int(os.getenv('VIP_PANEL_SIZE', '10'))
+app.config['STREAM_RENDER'] = os.getenv('STREAM_RENDER', '0') == '1'
+app.config['STREAM_CHUNK_SIZE'] = 16 * 1024
+# Largest number of operations accepted by one POST /api/contacts:batch.
+app.config['MAX_BATCH_OPERATIONS'] = int(os.getenv('MAX_BATCH_OPERATIONS', '50000'))
+# Per-route latency histograms and data-structure operation timers, served at
+# /metrics; read from METRICS_ENABLED=1 when metrics.py is imported.
+app.config['METRICS_ENABLED'] = METRICS_ENABLED
+instrument_app(app)
 
 start_time = time.time()
 
-# Initial data structures for undo/redo
-undo_stack = []
+# Initial data structures for undo/redo.
+# Both hold JournalEntry objects (lists of invertible operations), not state snapshots.
+undo_stack = deque()
 redo_queue = deque()
+journal_bytes = 0
 
 
 # Hash table for O(1) lookups
@@ -21,61 +63,149 @@ contact_dict = {}
 next_contact_id = 3
 
 # Copilot Prompt:
-# Create a Node class for a singly linked list to store contacts.
+# Create a Node class for a doubly linked list to store contacts.
 # Each node should store contact data (id, name, email, category)
-# and a reference to the next node in the list.
+# and references to the previous and next nodes in the list.
+# __slots__ removes the per-node __dict__.
 class Node:
+    __slots__ = ("data", "prev", "next")
+
     def __init__(self, data):
         self.data = data
+        self.prev = None
         self.next = None
 # Copilot Prompt:
-# Implement a singly linked list to store contacts.
+# Implement a doubly linked list to store contacts.
 # Each contact should be stored as [id, name, email, category].
-# Include methods for append, delete by ID, traversal, and conversion to/from a Python list.
+# Keep a tail pointer and an id -> node map so append, delete by ID,
+# insert after a given ID and move are all O(1).
+# Include methods for traversal and conversion to/from a Python list.
 class LinkedList:
     def __init__(self):
         self.head = None
+        self.tail = None
+        self.nodes = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, contact_id):
+        return contact_id in self.nodes
 
+    # Safe to interleave with writes: a node removed mid-walk keeps its next
+    # pointer (see _unlink) and is skipped, so the walk continues into the live list.
+    def __iter__(self):
+        current = self.head
+        while current:
+            if self.nodes.get(current.data[0]) is current:
+                yield current.data
+            current = current.next
+
+    def _link_after(self, prev, node):
+        if prev is None:
+            node.prev = None
+            node.next = self.head
+            if self.head:
+                self.head.prev = node
+            self.head = node
+        else:
+            node.prev = prev
+            node.next = prev.next
+            if prev.next:
+                prev.next.prev = node
+            prev.next = node
+        if node.next is None:
+            self.tail = node
+
+    def _unlink(self, node):
+        if node.prev:
+            node.prev.next = node.next
+        else:
+            self.head = node.next
+        if node.next:
+            node.next.prev = node.prev
+        else:
+            self.tail = node.prev
+        # node.prev/next are left as they were so an iterator positioned on
+        # this node can still follow it back into the list.
+
+    @timed("LinkedList", "append")
     def append(self, data):
         new_node = Node(data)
-        if not self.head:
-            self.head = new_node
-            return
-        last = self.head
-        while last.next:
-            last = last.next
-        last.next = new_node
+        self.nodes[data[0]] = new_node
+        self._link_after(self.tail, new_node)
 
+    # Returns the ID of the contact that preceded the deleted one (None if it
+    # was the head) so the deletion can be undone at the same position.
+    @timed("LinkedList", "delete")
     def delete(self, key):
-        temp = self.head
-        prev = None
-        while temp:
-            if temp.data[0] == key[0]:
-                if prev:
-                    prev.next = temp.next
-                else:
-                    self.head = temp.next
-                return
-            prev = temp
-            temp = temp.next
+        node = self.nodes.pop(key[0], None)
+        if node is None:
+            return None
+        prev_key = node.prev.data[0] if node.prev else None
+        self._unlink(node)
+        return prev_key
+
+    # Insert after the contact with ID prev_key; None inserts at the head.
+    # An unknown prev_key falls back to appending at the tail.
+    @timed("LinkedList", "insert_after")
+    def insert_after(self, prev_key, data):
+        new_node = Node(data)
+        self.nodes[data[0]] = new_node
+        if prev_key is None:
+            self._link_after(None, new_node)
+        else:
+            self._link_after(self.nodes.get(prev_key, self.tail), new_node)
 
+    # Move an existing contact so it follows prev_key (None moves it to the head).
+    @timed("LinkedList", "move")
+    def move(self, key, prev_key):
+        node = self.nodes.get(key)
+        if node is None or key == prev_key:
+            return
+        self._unlink(node)
+        if prev_key is None:
+            self._link_after(None, node)
+        else:
+            self._link_after(self.nodes.get(prev_key, self.tail), node)
+
+    @timed("LinkedList", "get")
+    def get(self, contact_id):
+        node = self.nodes.get(contact_id)
+        return node.data if node else None
+
+    def last_key(self):
+        return self.tail.data[0] if self.tail else None
+
+    @timed("LinkedList", "to_list")
     def to_list(self):
-        result = []
-        current = self.head
-        while current:
-            result.append(list(current.data))
-            current = current.next
-        return result
+        return [list(data) for data in self]
 
-    def from_list(self, data_list):
+    # Links the nodes in one pass instead of append() per contact.
+    # ids, when given, are the contact IDs parallel to data_list.
+    @timed("LinkedList", "from_list")
+    def from_list(self, data_list, ids=None):
         self.head = None
-        for data in data_list:
-            self.append(data)
+        self.tail = None
+        self.nodes = nodes = {}
+        prev = None
+        if ids is None:
+            ids = [data[0] for data in data_list]
+        for contact_id, data in zip(ids, data_list):
+            node = Node(data)
+            nodes[contact_id] = node
+            if prev is None:
+                self.head = node
+            else:
+                prev.next = node
+                node.prev = prev
+            prev = node
+        self.tail = prev
 
 
 contacts = LinkedList()
-contacts.append([1, 'Alice', 'alice@example.com', 'Personal'])
-contacts.append([2, 'Bob', 'bob@example.com', 'Work'])
+contacts.append(Contact(1, 'Alice', 'alice@example.com', 'Personal'))
+contacts.append(Contact(2, 'Bob', 'bob@example.com', 'Work'))
 
 # Copilot Prompt:
 # Use a Python dictionary as a hash table to map contact IDs to contact records.
@@ -87,17 +217,10 @@ while current:
 
 
 # Copilot Prompt:
-# Implement QuickSort to sort contacts by ID.
-# Use a divide-and-conquer approach with a pivot,
-# and recursively sort left and right partitions.
+# Sort contacts by ID with the shared in-place introsort from sorting.py.
+# The input list is left untouched; a sorted copy is returned.
 def quick_sort(data):
-    if len(data) <= 1:
-        return data
-    pivot = data[len(data)//2][0]
-    left = [x for x in data if x[0] < pivot]
-    mid = [x for x in data if x[0] == pivot]
-    right = [x for x in data if x[0] > pivot]
-    return quick_sort(left) + mid + quick_sort(right)
+    return sort_contacts(list(data), by="id")
 
 # Copilot Prompt:
 # Implement binary search to efficiently find a contact by ID
@@ -116,30 +239,486 @@ def binary_search(data, target):
     return None
 
 def find_contact_by_id(data, target):
+    if isinstance(data, (SortedContactView, ContactSnapshot)):
+        return data.find(target)
     return binary_search(data, target)
 
+# Copilot Prompt:
+# Maintain an ID-ordered view of the contacts incrementally so routes can
+# render and binary-search it without copying and re-sorting the linked list.
+# The view is a list of chunks of at most 2 * CHUNK_SIZE contacts (IDs
+# ascending across chunks); a bisect over each chunk's last ID finds the chunk,
+# so an insert or delete only shifts entries inside one chunk. IDs usually
+# arrive in increasing order (next_contact_id), so inserts are an O(1) append
+# to the last chunk.
+# freeze() returns an immutable ChunkedRecords for a published snapshot. A
+# chunk's tuple copy is kept until the chunk changes, so publishing after a
+# write copies one chunk plus O(n / CHUNK_SIZE) references, not every record.
+class SortedContactView:
+    CHUNK_SIZE = 512
+
+    def __init__(self):
+        self.id_chunks = []
+        self.chunks = []
+        self.maxes = []
+        self.frozen = []
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield from chunk
+
+    def __getitem__(self, index):
+        return self.freeze()[index]
+
+    @property
+    def ids(self):
+        return [contact_id for chunk in self.id_chunks for contact_id in chunk]
+
+    def insert(self, contact):
+        contact_id = contact[0]
+        if not self.chunks:
+            self._set_sorted([contact_id], [contact])
+            return
+        k = min(bisect_left(self.maxes, contact_id), len(self.maxes) - 1)
+        ids, chunk = self.id_chunks[k], self.chunks[k]
+        pos = bisect_left(ids, contact_id)
+        self.frozen[k] = None
+        if pos < len(ids) and ids[pos] == contact_id:
+            chunk[pos] = contact
+            return
+        ids.insert(pos, contact_id)
+        chunk.insert(pos, contact)
+        self.maxes[k] = ids[-1]
+        self.size += 1
+        if len(ids) > 2 * self.CHUNK_SIZE:
+            half = len(ids) // 2
+            self.id_chunks[k + 1:k + 1] = [ids[half:]]
+            self.chunks[k + 1:k + 1] = [chunk[half:]]
+            del ids[half:], chunk[half:]
+            self.maxes[k:k + 1] = [ids[-1], self.id_chunks[k + 1][-1]]
+            self.frozen[k:k + 1] = [None, None]
+
+    def remove(self, contact_id):
+        k = bisect_left(self.maxes, contact_id)
+        if k == len(self.maxes):
+            return
+        ids = self.id_chunks[k]
+        pos = bisect_left(ids, contact_id)
+        if pos < len(ids) and ids[pos] == contact_id:
+            del ids[pos]
+            del self.chunks[k][pos]
+            self.size -= 1
+            if ids:
+                self.maxes[k] = ids[-1]
+                self.frozen[k] = None
+            else:
+                del self.id_chunks[k], self.chunks[k], self.maxes[k], self.frozen[k]
+
+    # Index of the first contact whose ID is greater than contact_id (page cursor).
+    def position_after(self, contact_id):
+        return self.freeze().position_after(contact_id)
+
+    def find(self, contact_id):
+        k = bisect_left(self.maxes, contact_id)
+        if k < len(self.maxes):
+            ids = self.id_chunks[k]
+            pos = bisect_left(ids, contact_id)
+            if ids[pos] == contact_id:
+                return self.chunks[k][pos]
+        return None
+
+    def rebuild(self, data):
+        records = sorted(data, key=lambda c: c[0])
+        self._set_sorted([c[0] for c in records], records)
+
+    # Install parallel ID / record columns, sorting them unless already in ID order.
+    def load(self, ids, records):
+        order = sorted(range(len(ids)), key=ids.__getitem__)
+        self._set_sorted([ids[i] for i in order], [records[i] for i in order])
+
+    def _set_sorted(self, ids, records):
+        step = self.CHUNK_SIZE
+        self.id_chunks = [ids[i:i + step] for i in range(0, len(ids), step)]
+        self.chunks = [records[i:i + step] for i in range(0, len(records), step)]
+        self.maxes = [chunk[-1] for chunk in self.id_chunks]
+        self.frozen = [None] * len(self.chunks)
+        self.size = len(ids)
+
+    def freeze(self):
+        frozen = self.frozen
+        for k, chunk in enumerate(frozen):
+            if chunk is None:
+                frozen[k] = tuple(self.chunks[k])
+        return ChunkedRecords(tuple(frozen), tuple(self.maxes))
+
+
+# Immutable ID-ordered sequence of contacts made of shared chunk tuples
+# (see SortedContactView.freeze). Supports len, iteration, indexing, slicing,
+# find by ID and the page cursor lookup.
+class ChunkedRecords:
+    __slots__ = ("chunks", "maxes", "starts", "size")
+
+    def __init__(self, chunks=(), maxes=()):
+        self.chunks = chunks
+        self.maxes = maxes
+        self.starts = list(accumulate(map(len, chunks), initial=0))
+        self.size = self.starts.pop()
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield from chunk
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            result = []
+            k = max(bisect_right(self.starts, start) - 1, 0)
+            while start < stop and k < len(self.chunks):
+                offset = start - self.starts[k]
+                piece = self.chunks[k][offset:offset + stop - start]
+                result.extend(piece)
+                start += len(piece)
+                k += 1
+            return result
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("contact index out of range")
+        k = bisect_right(self.starts, index) - 1
+        return self.chunks[k][index - self.starts[k]]
+
+    def find(self, contact_id):
+        k = bisect_left(self.maxes, contact_id)
+        if k < len(self.maxes):
+            chunk = self.chunks[k]
+            pos = bisect_left(chunk, contact_id, key=itemgetter(0))
+            if chunk[pos][0] == contact_id:
+                return chunk[pos]
+        return None
+
+    def position_after(self, contact_id):
+        k = bisect_right(self.maxes, contact_id)
+        if k == len(self.maxes):
+            return self.size
+        return self.starts[k] + bisect_right(self.chunks[k], contact_id, key=itemgetter(0))
+
+
+sorted_contacts = SortedContactView()
+
+# Copilot Prompt:
+# Maintain a prefix index over one contact field (name or email) as two
+# parallel sorted columns, casefolded values and IDs, ordered by (value, id).
+# A prefix query is a bisect to the first match followed by a scan that stops
+# at the first non-match, so it costs O(log n + limit). Adds and deletes are a
+# bisect plus a list insert/del. Columns avoid a (value, id) tuple per entry,
+# and a value that is already casefolded (most emails) is stored as the
+# contact's own string rather than a copy.
+class PrefixIndex:
+    def __init__(self, field):
+        self.field = field
+        self.values = []
+        self.ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def entries(self):
+        return list(zip(self.values, self.ids))
+
+    def fold(self, contact):
+        return self.fold_value(contact[self.field])
+
+    @staticmethod
+    def fold_value(value):
+        folded = value.casefold()
+        return value if folded == value else folded
+
+    # Position of (value, contact_id): bisect the value, then the ID within
+    # the run of equal values.
+    def position(self, value, contact_id):
+        lo = bisect_left(self.values, value)
+        hi = bisect_right(self.values, value, lo)
+        return bisect_left(self.ids, contact_id, lo, hi)
+
+    def add(self, contact):
+        value, contact_id = self.fold(contact), contact[0]
+        if not self.ids or (value, contact_id) > (self.values[-1], self.ids[-1]):
+            self.values.append(value)
+            self.ids.append(contact_id)
+            return
+        pos = self.position(value, contact_id)
+        if pos < len(self.ids) and self.ids[pos] == contact_id and self.values[pos] == value:
+            return
+        self.values.insert(pos, value)
+        self.ids.insert(pos, contact_id)
+
+    def remove(self, contact):
+        value, contact_id = self.fold(contact), contact[0]
+        pos = self.position(value, contact_id)
+        if pos < len(self.ids) and self.ids[pos] == contact_id and self.values[pos] == value:
+            del self.values[pos]
+            del self.ids[pos]
+
+    # Returns matching contact IDs ordered by field value, then ID.
+    def search(self, prefix, limit=20):
+        prefix = prefix.casefold()
+        pos = bisect_left(self.values, prefix)
+        result = []
+        while pos < len(self.values) and len(result) < limit:
+            if not self.values[pos].startswith(prefix):
+                break
+            result.append(self.ids[pos])
+            pos += 1
+        return result
+
+    def rebuild(self, data):
+        pairs = sorted((self.fold(c), c[0]) for c in data)
+        self.values = [value for value, _ in pairs]
+        self.ids = [contact_id for _, contact_id in pairs]
+
+    # Install IDs and field values already in (value, id) order (e.g. from a
+    # snapshot) without sorting.
+    def load(self, ids, values):
+        folded = [value.casefold() for value in values]
+        self.ids = list(ids)
+        self.values = [value if value == fold else fold for value, fold in zip(values, folded)]
+
+
+# Fields exposed through /search?field=...&prefix=...
+prefix_indexes = {
+    "name": PrefixIndex(1),
+    "email": PrefixIndex(2),
+}
+
+# Copilot Prompt:
+# Maintain a trigram inverted index over one contact field for substring and
+# typo-tolerant search. Each casefolded value is padded with spaces and split
+# into overlapping 3-character grams; postings map gram -> sorted array of
+# contact IDs (8 bytes per entry instead of a hash-set slot).
+# A query is scored by the fraction of its grams a contact shares, and exact
+# substring matches rank first.
+# Removal is lazy: the ID and its old value go into `removed`, searches skip
+# it, and the arrays are compacted once a quarter of their IDs are removed.
+# Re-adding a removed ID with the same value (undo of a delete) only takes it
+# out of `removed`; an undone add can hand its ID to a different contact, so
+# then the old postings are dropped first.
+class TrigramIndex:
+    def __init__(self, field, threshold=0.3):
+        self.field = field
+        self.threshold = threshold
+        self.postings = {}
+        self.removed = {}
+        self.size = 0
+
+    @staticmethod
+    def grams(text):
+        padded = " " + text.casefold() + " "
+        if len(padded) < 3:
+            return {padded}
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def add(self, contact):
+        contact_id = contact[0]
+        value = contact[self.field]
+        if contact_id in self.removed:
+            old_value = self.removed.pop(contact_id)
+            if old_value == value:
+                return
+            self.discard(contact_id, old_value)
+        postings = self.postings
+        for gram in self.grams(value):
+            ids = postings.get(gram)
+            if ids is None:
+                postings[gram] = array('q', (contact_id,))
+            elif contact_id > ids[-1]:
+                ids.append(contact_id)
+            else:
+                pos = bisect_left(ids, contact_id)
+                if pos == len(ids) or ids[pos] != contact_id:
+                    ids.insert(pos, contact_id)
+        self.size += 1
+
+    def remove(self, contact):
+        self.removed[contact[0]] = contact[self.field]
+        if len(self.removed) > max(1024, self.size // 4):
+            self.compact()
+
+    # Physically drop one ID from the postings of value's grams.
+    def discard(self, contact_id, value):
+        for gram in self.grams(value):
+            ids = self.postings.get(gram)
+            if ids is None:
+                continue
+            pos = bisect_left(ids, contact_id)
+            if pos < len(ids) and ids[pos] == contact_id:
+                del ids[pos]
+                if not ids:
+                    del self.postings[gram]
+        self.size = max(self.size - 1, 0)
+
+    def compact(self):
+        removed = self.removed
+        for gram, ids in list(self.postings.items()):
+            kept = array('q', (i for i in ids if i not in removed))
+            if kept:
+                self.postings[gram] = kept
+            else:
+                del self.postings[gram]
+        self.size = max(self.size - len(removed), 0)
+        removed.clear()
+
+    # gram -> sorted live IDs (for consistency checks).
+    def live_postings(self):
+        live = {}
+        for gram, ids in self.postings.items():
+            kept = [i for i in ids if i not in self.removed]
+            if kept:
+                live[gram] = kept
+        return live
+
+    # Bulk build in a single pass over the linked list.
+    def rebuild(self, data):
+        grouped = {}
+        count = 0
+        for contact in data:
+            contact_id = contact[0]
+            for gram in self.grams(contact[self.field]):
+                try:
+                    grouped[gram].append(contact_id)
+                except KeyError:
+                    grouped[gram] = [contact_id]
+            count += 1
+        self.postings = {gram: array('q', sorted(ids)) for gram, ids in grouped.items()}
+        self.removed = {}
+        self.size = count
+
+    # Install postings saved by a snapshot (sorted live IDs per gram).
+    def load(self, postings, size):
+        self.postings = postings
+        self.removed = {}
+        self.size = size
+
+    # Returns up to limit (contact ID, score) pairs, best match first.
+    # lookup maps an ID to its contact record so substring hits can be verified.
+    def search(self, query, lookup, limit=20):
+        text = query.casefold().strip()
+        if not text:
+            return []
+        if len(text) < 3:
+            return self.search_short(text, lookup, limit)
+        query_grams = self.grams(text)
+        needed = max(1, math.ceil(round(self.threshold * len(query_grams), 6)))
+
+        # Any contact sharing `needed` grams must appear in one of the
+        # len - needed + 1 smallest posting lists, so only those seed the
+        # candidate set; the larger (common) grams only add to existing counts.
+        lists = sorted((self.postings.get(g, ()) for g in query_grams), key=len)
+        split = len(lists) - needed + 1
+        counts = Counter()
+        for ids in lists[:split]:
+            counts.update(ids)
+        for ids in lists[split:]:
+            for contact_id in counts:
+                pos = bisect_left(ids, contact_id)
+                if pos < len(ids) and ids[pos] == contact_id:
+                    counts[contact_id] += 1
+
+        ranked = []
+        for contact_id, shared in counts.items():
+            contact = lookup.get(contact_id)
+            if contact is None or contact_id in self.removed:
+                continue
+            substring = text in contact[self.field].casefold()
+            score = shared / len(query_grams)
+            if substring or score >= self.threshold:
+                ranked.append((substring, score, -contact_id))
+
+        ranked = heapq.nlargest(limit, ranked)
+        return [(-neg_id, 1.0 if substring else score) for substring, score, neg_id in ranked]
+
+    # A query shorter than a gram has no grams of its own (padding it would
+    # only match at word boundaries). Every value containing it has a gram
+    # containing it, so merge those grams' postings in ID order and stop at
+    # `limit` verified substring matches, lowest IDs first like full matches.
+    def search_short(self, text, lookup, limit):
+        lists = [ids for gram, ids in self.postings.items() if text in gram]
+        results = []
+        last = None
+        for contact_id in heapq.merge(*lists):
+            if contact_id == last:
+                continue
+            last = contact_id
+            contact = lookup.get(contact_id)
+            if contact is None or contact_id in self.removed:
+                continue
+            if text in contact[self.field].casefold():
+                results.append((contact_id, 1.0))
+                if len(results) == limit:
+                    break
+        return results
+
+
+# Fields exposed through /search?field=...&contains=...
+trigram_indexes = {
+    "name": TrigramIndex(1),
+    "email": TrigramIndex(2),
+}
+
 # Copilot Prompt:
 # Create a TreeNode class to represent hierarchical categories.
-# Each node should store a category name, a list of contacts,
-# and references to child categories.
+# Each node should store a category name, its contacts keyed by ID
+# (O(1) add/remove/duplicate check), references to child categories and
+# its parent. Each node also tracks the contact count of its subtree, its
+# Euler-tour interval [tin, tout] and a cached build_tree_view() result
+# that is marked dirty whenever the subtree changes.
 class TreeNode:
     def __init__(self, value):
         self.value = value
         self.children = []
-        self.contacts = []
+        self.contacts = {}
+        self.parent = None
+        self.subtree_count = 0
+        self.tin = 0
+        self.tout = 0
+        self.dirty = True
+        self.view = None
 
     def add_child(self, node):
+        node.parent = self
         self.children.append(node)
+        self.subtree_changed(node.subtree_count)
 
     def add_contact(self, contact):
-        if not any(c[0] == contact[0] for c in self.contacts):
-            self.contacts.append(contact)
+        if contact[0] not in self.contacts:
+            self.contacts[contact[0]] = contact
+            self.subtree_changed(1)
 
     def remove_contact(self, contact):
-        self.contacts = [c for c in self.contacts if c[0] != contact[0]]
+        if self.contacts.pop(contact[0], None) is not None:
+            self.subtree_changed(-1)
+
+    # Update subtree counts and dirty flags from this node up to the root: O(depth).
+    def subtree_changed(self, delta):
+        node = self
+        while node:
+            node.subtree_count += delta
+            node.dirty = True
+            node = node.parent
 
     def clear_contacts_recursive(self):
-        self.contacts = []
+        self.contacts = {}
+        self.subtree_count = 0
+        self.dirty = True
         for child in self.children:
             child.clear_contacts_recursive()
 
@@ -154,120 +733,434 @@ class TreeNode:
 
 # Copilot Prompt:
 # Implement a CategoryTree class with a root node called "Contacts".
-# Provide methods to find categories recursively and add new categories
-# under a given parent node.
+# Keep a name -> node index so category lookup is O(1) instead of a DFS,
+# and add new categories under a given parent node.
+# Euler-tour intervals let subtree queries scan a flat slice of nodes instead
+# of walking the tree. Adding a category only marks them stale; they are
+# recomputed once, on the next query, so creating many categories (an import
+# with thousands of new ones) costs one O(n) pass instead of one per category.
 class CategoryTree:
     def __init__(self):
         self.root = TreeNode("Contacts")
+        self.nodes = {self.root.value.lower(): self.root}
+        self._euler = []
+        self.stale = True
 
+    @timed("CategoryTree", "get_category")
     def get_category(self, name):
-        return self.root.find(name)
+        return self.nodes.get(name.lower())
 
+    @timed("CategoryTree", "add_category")
     def add_category(self, parent, name):
         parent_node = self.get_category(parent)
         if not parent_node:
             return None
         node = TreeNode(name)
         parent_node.add_child(node)
+        self.nodes.setdefault(name.lower(), node)
+        self.stale = True
         return node
 
+    # Nodes in preorder (parents before children), reindexed first if stale.
+    @property
+    def euler(self):
+        if self.stale:
+            self.reindex()
+        return self._euler
+
+    # Assign preorder entry/exit positions: node B is in A's subtree
+    # exactly when A.tin <= B.tin <= A.tout.
+    @timed("CategoryTree", "reindex")
+    def reindex(self):
+        euler = self._euler = []
+        stack = [(self.root, False)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                node.tout = len(euler) - 1
+                continue
+            node.tin = len(euler)
+            euler.append(node)
+            stack.append((node, True))
+            for child in reversed(node.children):
+                stack.append((child, False))
+        self.stale = False
+
+    @timed("CategoryTree", "subtree_nodes")
+    def subtree_nodes(self, name):
+        node = self.get_category(name)
+        if not node:
+            return []
+        return self.euler[node.tin:node.tout + 1]
+
+    # All contacts in a category and its descendants.
+    def contacts_under(self, name):
+        for node in self.subtree_nodes(name):
+            yield from node.contacts.values()
+
+    def subtree_count(self, name):
+        node = self.get_category(name)
+        return node.subtree_count if node else 0
+
+    def in_subtree(self, ancestor, node):
+        if self.stale:
+            self.reindex()
+        return ancestor.tin <= node.tin <= ancestor.tout
+
+    # Replace every node's contacts in one pass, then set subtree counts
+    # bottom-up from the Euler order instead of walking to the root per contact.
+    @timed("CategoryTree", "load_contacts")
+    def load_contacts(self, data):
+        groups = {}
+        for contact in data:
+            members = groups.get(contact[3])
+            if members is None:
+                members = groups[contact[3]] = {}
+            members[contact[0]] = contact
+        self.load_groups(groups)
+
+    # groups maps category name -> {contact ID: contact}.
+    def load_groups(self, groups):
+        self.root.clear_contacts_recursive()
+        for category, members in groups.items():
+            node = self.get_category(category)
+            if node:
+                node.contacts.update(members)
+        for node in reversed(self.euler):
+            node.subtree_count = len(node.contacts) + sum(child.subtree_count for child in node.children)
+
 
 # Copilot Prompt:
 # Create a BSTNode class to store category names as keys
 # and references to TreeNode objects as values.
-# Each node should support left and right children.
+# Each node should support left and right children and store the
+# height of its subtree for AVL balancing.
 class BSTNode:
+    __slots__ = ("key", "value", "left", "right", "height")
+
     def __init__(self, key, value):
         self.key = key.lower()
         self.value = value
         self.left = None
         self.right = None
+        self.height = 1
 
-    def insert(self, key, value):
-        key = key.lower()
-        if key < self.key:
-            if self.left:
-                self.left.insert(key, value)
-            else:
-                self.left = BSTNode(key, value)
-        elif key > self.key:
-            if self.right:
-                self.right.insert(key, value)
-            else:
-                self.right = BSTNode(key, value)
 
-    def search(self, key):
-        key = key.lower()
-        if key == self.key:
-            return self.value
-        elif key < self.key and self.left:
-            return self.left.search(key)
-        elif key > self.key and self.right:
-            return self.right.search(key)
-        return None
+def node_height(node):
+    return node.height if node else 0
 
 # Copilot Prompt:
-# Implement a Binary Search Tree (BST) for category lookup.
-# Include insert and search operations to achieve O(log n) access time.
+# Implement a self-balancing (AVL) Binary Search Tree for category lookup.
+# Insert, search and delete are iterative (no recursion limit with thousands
+# of categories) and keep the tree height O(log n) regardless of insert order.
+# Also support O(n) bulk-build from a sorted list and in-order range iteration.
 class CategoryBST:
     def __init__(self):
         self.root = None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return self.range_items()
+
+    @staticmethod
+    def _update(node):
+        node.height = 1 + max(node_height(node.left), node_height(node.right))
+
+    def _rotate_right(self, node):
+        pivot = node.left
+        node.left = pivot.right
+        pivot.right = node
+        self._update(node)
+        self._update(pivot)
+        return pivot
+
+    def _rotate_left(self, node):
+        pivot = node.right
+        node.right = pivot.left
+        pivot.left = node
+        self._update(node)
+        self._update(pivot)
+        return pivot
+
+    def _rebalance(self, node):
+        self._update(node)
+        balance = node_height(node.left) - node_height(node.right)
+        if balance > 1:
+            if node_height(node.left.left) < node_height(node.left.right):
+                node.left = self._rotate_left(node.left)
+            return self._rotate_right(node)
+        if balance < -1:
+            if node_height(node.right.right) < node_height(node.right.left):
+                node.right = self._rotate_right(node.right)
+            return self._rotate_left(node)
+        return node
 
+    # Rebalance every node on the root-to-change path, bottom-up, and
+    # re-attach each (possibly rotated) subtree to its parent.
+    def _rebalance_path(self, path):
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            subtree = self._rebalance(node)
+            if i == 0:
+                self.root = subtree
+            elif path[i - 1].left is node:
+                path[i - 1].left = subtree
+            else:
+                path[i - 1].right = subtree
+
+    @timed("CategoryBST", "insert")
     def insert(self, key, value):
+        key = key.lower()
         if not self.root:
             self.root = BSTNode(key, value)
+            self.size = 1
+            return
+
+        path = []
+        node = self.root
+        while node:
+            path.append(node)
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:
+                return
+
+        parent = path[-1]
+        if key < parent.key:
+            parent.left = BSTNode(key, value)
         else:
-            self.root.insert(key, value)
+            parent.right = BSTNode(key, value)
+        self.size += 1
+        self._rebalance_path(path)
 
+    @timed("CategoryBST", "search")
     def search(self, key):
-        if not self.root:
+        key = key.lower()
+        node = self.root
+        while node:
+            if key == node.key:
+                return node.value
+            node = node.left if key < node.key else node.right
+        return None
+
+    # Remove a category and return its value (None if it was not present).
+    @timed("CategoryBST", "delete")
+    def delete(self, key):
+        key = key.lower()
+        path = []
+        node = self.root
+        while node and node.key != key:
+            path.append(node)
+            node = node.left if key < node.key else node.right
+        if not node:
             return None
-        return self.root.search(key)
+
+        value = node.value
+        if node.left and node.right:
+            # Replace with the in-order successor, then unlink the successor.
+            path.append(node)
+            successor = node.right
+            while successor.left:
+                path.append(successor)
+                successor = successor.left
+            node.key, node.value = successor.key, successor.value
+            node, replacement = successor, successor.right
+        else:
+            replacement = node.left or node.right
+
+        if not path:
+            self.root = replacement
+        elif path[-1].left is node:
+            path[-1].left = replacement
+        else:
+            path[-1].right = replacement
+
+        self.size -= 1
+        self._rebalance_path(path)
+        return value
+
+    # Build a perfectly balanced tree from (key, value) pairs sorted by key in O(n).
+    @timed("CategoryBST", "build_from_sorted")
+    def build_from_sorted(self, items):
+        items = [(key.lower(), value) for key, value in items]
+        unique = []
+        for key, value in items:
+            if not unique or unique[-1][0] != key:
+                unique.append((key, value))
+
+        def build(low, high):
+            if low > high:
+                return None
+            mid = (low + high) // 2
+            node = BSTNode(*unique[mid])
+            node.left = build(low, mid - 1)
+            node.right = build(mid + 1, high)
+            self._update(node)
+            return node
+
+        self.root = build(0, len(unique) - 1)
+        self.size = len(unique)
+
+    # Yield (key, value) pairs in key order with low <= key <= high
+    # (either bound may be None). Subtrees outside the range are skipped.
+    def range_items(self, low=None, high=None):
+        low = low.lower() if low is not None else None
+        high = high.lower() if high is not None else None
+        stack = []
+        node = self.root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left if low is None or node.key > low else None
+            node = stack.pop()
+            if (low is None or node.key >= low) and (high is None or node.key <= high):
+                yield node.key, node.value
+            if high is not None and node.key >= high:
+                return
+            node = node.right
 
 
 # Copilot Prompt:
-# Implement a priority queue using Python's heapq module.
+# Implement an indexed priority queue (binary max-heap).
 # Store VIP contacts with priority values so that higher priority
-# contacts are retrieved first (use negative values for max-heap behavior).
+# contacts are retrieved first (entries are (-priority, contact_id) so the
+# smallest tuple is the highest priority, as with heapq).
+# A position map (contact_id -> index in the heap list) makes remove and
+# update_priority O(log n), and top_k(k) reads the k best entries in
+# O(k log k) without copying the heap.
 class MaxHeap:
     def __init__(self):
         self.heap = []
-
+        self.pos = {}
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, contact_id):
+        return contact_id in self.pos
+
+    def _swap(self, i, j):
+        heap = self.heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self.pos[heap[i][1]] = i
+        self.pos[heap[j][1]] = j
+
+    def _sift_up(self, i):
+        heap = self.heap
+        while i > 0:
+            parent = (i - 1) // 2
+            if heap[i] < heap[parent]:
+                self._swap(i, parent)
+                i = parent
+            else:
+                break
+
+    def _sift_down(self, i):
+        heap = self.heap
+        n = len(heap)
+        while True:
+            best = i
+            left = 2 * i + 1
+            right = left + 1
+            if left < n and heap[left] < heap[best]:
+                best = left
+            if right < n and heap[right] < heap[best]:
+                best = right
+            if best == i:
+                break
+            self._swap(i, best)
+            i = best
+
+    @timed("MaxHeap", "insert")
     def insert(self, contact_id, priority):
-        heapq.heappush(self.heap, (-priority, contact_id))
+        if contact_id in self.pos:
+            self.update_priority(contact_id, priority)
+            return
+        self.heap.append((-priority, contact_id))
+        self.pos[contact_id] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
 
+    @timed("MaxHeap", "remove")
     def remove(self, contact_id):
-        self.heap = [item for item in self.heap if item[1] != contact_id]
-        heapq.heapify(self.heap)
+        i = self.pos.pop(contact_id, None)
+        if i is None:
+            return
+        last = self.heap.pop()
+        if i < len(self.heap):
+            self.heap[i] = last
+            self.pos[last[1]] = i
+            self._sift_up(i)
+            self._sift_down(self.pos[last[1]])
+
+    @timed("MaxHeap", "update_priority")
+    def update_priority(self, contact_id, priority):
+        i = self.pos.get(contact_id)
+        if i is None:
+            self.insert(contact_id, priority)
+            return
+        self.heap[i] = (-priority, contact_id)
+        self._sift_up(i)
+        self._sift_down(self.pos[contact_id])
+
+    def priority(self, contact_id):
+        i = self.pos.get(contact_id)
+        return -self.heap[i][0] if i is not None else None
 
     def clear(self):
         self.heap = []
+        self.pos = {}
+
+    # Bulk load (contact_id, priority) pairs with heapify: O(n).
+    @timed("MaxHeap", "build")
+    def build(self, items):
+        self.heap = [(-priority, cid) for cid, priority in items]
+        heapq.heapify(self.heap)
+        self.pos = {cid: i for i, (_, cid) in enumerate(self.heap)}
 
     def get_all_ids(self):
         sorted_heap = sorted(self.heap)
         return [cid for _, cid in sorted_heap]
-    
+
+    # Copilot Prompt:
+    # Return the k highest priority contact IDs in order without modifying or
+    # copying the heap: expand candidates from the root with a small side heap
+    # of heap indices, so only O(k) entries are ever examined.
+    @timed("MaxHeap", "top_k")
+    def top_k(self, k):
+        heap = self.heap
+        result = []
+        if not heap or k <= 0:
+            return result
+        frontier = [(heap[0], 0)]
+        while frontier and len(result) < k:
+            entry, i = heapq.heappop(frontier)
+            result.append(entry[1])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return result
+
     # Copilot Prompt:
     # Implement extract_max to remove and return the highest priority contact ID
     # from the heap, restoring heap structure after removal.
+    @timed("MaxHeap", "extract_max")
     def extract_max(self):
         if not self.heap:
             return None
-        _, contact_id = heapq.heappop(self.heap)
+        contact_id = self.heap[0][1]
+        self.remove(contact_id)
         return contact_id
-    
+
     # Copilot Prompt:
-    # Retrieve all elements in priority order using extract_max without modifying
-    # the original heap by operating on a copy of the heap.
+    # Retrieve all elements in priority order without modifying the original heap.
     def extract_all_in_order(self):
-        temp_heap = list(self.heap)
-        result = []
-        while temp_heap:
-            _, cid = heapq.heappop(temp_heap)
-            result.append(cid)
+        return self.top_k(len(self.heap))
 
-        return result
-    
     # Copilot Prompt:
     # Add a method to retrieve all elements from the max heap in descending priority order
     # without modifying the original heap. 
@@ -301,16 +1194,16 @@ category_tree.add_category("HR", "Payroll")
 category_tree.add_category("Personal", "Family")
 category_tree.add_category("Personal", "Friends")
 
-# Insert ALL categories into BST
-for name in [
-    "Work", "Personal",
-    "IT", "HR",
-    "Infrastructure", "Security",
-    "Recruiting", "Payroll",
-    "Family", "Friends"
-]:
-    node = category_tree.get_category(name)
-    category_bst.insert(name, node)
+# Insert ALL categories into BST (bulk-built from the sorted names)
+category_bst.build_from_sorted(sorted(
+    (name.lower(), category_tree.get_category(name)) for name in [
+        "Work", "Personal",
+        "IT", "HR",
+        "Infrastructure", "Security",
+        "Recruiting", "Payroll",
+        "Family", "Friends"
+    ]
+))
 
 # Helper function to rebuild all derived data structures (hash table, tree, heap)
 # from the linked list to ensure consistency after updates, undo, and redo operations.
@@ -322,88 +1215,925 @@ def rebuild_hash_table():
     while current:
         contact_dict[current.data[0]] = current.data
         current = current.next
+    rebuild_ordered_indexes()
+    for trigram_index in trigram_indexes.values():
+        trigram_index.rebuild(contacts)
+
+
+# The ID-ordered view and prefix indexes are sorted arrays: one insert or
+# delete is a memmove, so bulk writes skip them and re-sort once at the end.
+bulk_loading = False
+
+def rebuild_ordered_indexes():
+    sorted_contacts.rebuild(contact_dict.values())
+    for prefix_index in prefix_indexes.values():
+        prefix_index.rebuild(contact_dict.values())
 
 # Copilot Prompt:
 # Rebuild all derived data structures (hash table, tree, heap)
 # from the linked list to ensure consistency after updates,
 # undo, and redo operations.
+@timed("app", "rebuild_all_structures")
 def rebuild_all_structures():
     rebuild_hash_table()
 
-    # Clear tree
-    category_tree.root.clear_contacts_recursive()
-
     # Rebuild tree
-    current = contacts.head
-    while current:
-        c = current.data
-        node = category_tree.get_category(c[3])
-        if node:
-            node.add_contact(c)
-        current = current.next
+    category_tree.load_contacts(contacts)
 
     # Rebuild heap
-    vip_heap.clear()
-    for cid, p in vip_priority_map.items():
-        vip_heap.insert(cid, p)
+    vip_heap.build(vip_priority_map.items())
 
 
-def snapshot_state():
-    return {
-        "contacts": contacts.to_list(),
-        "next_id": next_contact_id,
-        "vip": dict(vip_priority_map)
+# Index the seed contacts once at startup; later writes are incremental.
+rebuild_all_structures()
+
+
+# Ensure a category exists in the BST (and the tree); new categories go under the root.
+def ensure_category(category):
+    node = category_bst.search(category)
+    if not node:
+        node = category_tree.add_category("Contacts", category)
+        category_bst.insert(category, node)
+    return node
+
+
+# Copilot Prompt:
+# Update only the hash table entry, category node and heap entry touched by a
+# single contact instead of rebuilding every derived structure (O(1) per write
+# for the hash table instead of O(n) for a full rebuild).
+def index_contact(contact, node=None):
+    contact_dict[contact[0]] = contact
+    if not bulk_loading:
+        sorted_contacts.insert(contact)
+        for prefix_index in prefix_indexes.values():
+            prefix_index.add(contact)
+    for trigram_index in trigram_indexes.values():
+        trigram_index.add(contact)
+
+    if node is None:
+        node = category_tree.get_category(contact[3])
+    if node:
+        node.add_contact(contact)
+
+    priority = vip_priority_map.get(contact[0])
+    if priority:
+        vip_heap.insert(contact[0], priority)
+
+
+def unindex_contact(contact):
+    contact_dict.pop(contact[0], None)
+    if not bulk_loading:
+        sorted_contacts.remove(contact[0])
+        for prefix_index in prefix_indexes.values():
+            prefix_index.remove(contact)
+    for trigram_index in trigram_indexes.values():
+        trigram_index.remove(contact)
+
+    node = category_tree.get_category(contact[3])
+    if node:
+        node.remove_contact(contact)
+
+    vip_priority_map.pop(contact[0], None)
+    vip_heap.remove(contact[0])
+
+
+def collect_tree_contacts(node, result):
+    result[node.value] = (sorted(node.contacts), node.subtree_count)
+    for child in node.children:
+        collect_tree_contacts(child, result)
+    return result
+
+
+# Copilot Prompt:
+# Consistency-check mode: capture the incrementally maintained indexes, run a
+# full rebuild from the linked list and compare the two. The rebuilt state is
+# kept, so a mismatch is also repaired.
+def check_consistency():
+    incremental = (
+        list(sorted_contacts.ids),
+        {field: list(ix.entries) for field, ix in prefix_indexes.items()},
+        {field: ix.live_postings() for field, ix in trigram_indexes.items()},
+        collect_tree_contacts(category_tree.root, {}),
+        sorted(vip_heap.heap),
+    )
+
+    rebuild_all_structures()
+
+    rebuilt = (
+        list(sorted_contacts.ids),
+        {field: list(ix.entries) for field, ix in prefix_indexes.items()},
+        {field: ix.live_postings() for field, ix in trigram_indexes.items()},
+        collect_tree_contacts(category_tree.root, {}),
+        sorted(vip_heap.heap),
+    )
+
+    if incremental != rebuilt:
+        app.logger.warning("Incremental indexes drifted from the linked list; rebuilt")
+        return False
+    return True
+
+
+# Copilot Prompt:
+# Page, VIP, tree and ID-search readers never touch the mutable structures
+# above (the text-search routes and /export take store.lock for what is not
+# snapshotted). Writers are serialized by store.lock (see serialized_write)
+# and, when a write is complete, publish an immutable ContactSnapshot with the
+# next version: the ID-ordered records (ChunkedRecords, sharing unchanged
+# chunks with the previous version), the VIP panel, and the category tree
+# view. Publishing is one reference assignment, so GET / takes store.snapshot
+# once, never waits behind a write, and never sees a half-applied one.
+class ContactSnapshot:
+    __slots__ = ("version", "records", "vip_contacts", "vip_total", "tree")
+
+    def __init__(self, version, records, vip_contacts, vip_total, tree):
+        self.version = version
+        self.records = records
+        self.vip_contacts = vip_contacts
+        self.vip_total = vip_total
+        self.tree = tree
+
+    def __len__(self):
+        return len(self.records)
+
+    def find(self, contact_id):
+        return self.records.find(contact_id)
+
+    # Index of the first contact whose ID is greater than contact_id (page cursor).
+    def position_after(self, contact_id):
+        return self.records.position_after(contact_id)
+
+
+class ContactStore:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.snapshot = ContactSnapshot(0, ChunkedRecords(), (), 0, None)
+
+    # Called with the lock held, after the write has been fully applied.
+    def publish(self):
+        snapshot = ContactSnapshot(
+            self.snapshot.version + 1,
+            sorted_contacts.freeze(),
+            top_vip_contacts(),
+            len(vip_heap),
+            build_tree_view(category_tree.root),
+        )
+        fragment_cache.clear()
+        self.snapshot = snapshot
+
+
+store = ContactStore()
+
+
+# In shared mode (SHARED_STATE_PATH, see shared_state.py) the write also holds
+# the change log's cross-process lock and starts from the latest shared state.
+def serialized_write(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with store.lock:
+            if shared_log is None:
+                return view(*args, **kwargs)
+            with shared_log.transaction():
+                catch_up()
+                response = view(*args, **kwargs)
+                if shared_log.checkpoint_due():
+                    checkpoint_shared_state()
+                return response
+    return wrapper
+
+
+# Rendered fragments of the index page (contact list, VIP panel, category
+# tree) are cached per snapshot version, and the version is the index page's
+# ETag, so read-only refreshes are served from the cache or answered with
+# 304 Not Modified. Keys include the version, so a fragment rendered from an
+# older snapshot is never served for a newer one.
+fragment_cache = {}
+FRAGMENT_CACHE_SIZE = 256
+
+def cached_fragment(snapshot, name, key, render):
+    cache_key = (snapshot.version, name, key)
+    html = fragment_cache.get(cache_key)
+    if html is None:
+        if len(fragment_cache) >= FRAGMENT_CACHE_SIZE:
+            fragment_cache.clear()
+        html = fragment_cache[cache_key] = Markup(render())
+    return html
+
+
+# The start time distinguishes versions of different processes (the counter
+# restarts while persisted data may differ).
+def index_etag(snapshot):
+    return f"{int(start_time * 1000):x}-{snapshot.version}"
+
+
+def after_write():
+    if app.config['CONSISTENCY_CHECK']:
+        check_consistency()
+    store.publish()
+
+
+# Copilot Prompt:
+# Store each write as a list of invertible operations instead of a full copy
+# of the state. Operations are tuples:
+#   ("insert", contact, priority, prev_id)
+#   ("delete", contact, priority, prev_id)
+#   ("priority", contact_id, old_priority, new_priority)
+# prev_id is the contact that precedes this one in the linked list, so an undone
+# delete is re-inserted where it was. Undo and redo cost O(1) per operation
+# (plus the linked list position lookup) instead of O(n) per snapshot.
+class JournalEntry:
+    __slots__ = ("ops", "next_id_before", "next_id_after", "size")
+
+    def __init__(self, ops, next_id_before, next_id_after):
+        self.ops = ops
+        self.next_id_before = next_id_before
+        self.next_id_after = next_id_after
+        self.size = estimate_ops_size(ops)
+
+
+# Bulk entries are sized from a sample of their operations.
+def estimate_ops_size(ops, sample=256):
+    if len(ops) <= sample:
+        return sum(operation_size(op) for op in ops)
+    step = len(ops) // sample
+    sampled = sum(operation_size(ops[i]) for i in range(0, step * sample, step))
+    return sampled * len(ops) // sample
+
+
+def operation_size(op):
+    size = sys.getsizeof(op)
+    if op[0] != "priority":
+        size += sum(sys.getsizeof(field) for field in op[1])
+    return size
+
+
+# Operations read back from JSON (the shared change log) have list contacts.
+def decode_operation(op):
+    if op[0] in ("insert", "delete"):
+        return (op[0], Contact.from_row(op[1])) + tuple(op[2:])
+    return tuple(op)
+
+
+def invert_operation(op):
+    kind = op[0]
+    if kind == "insert":
+        return ("delete",) + op[1:]
+    if kind == "delete":
+        return ("insert",) + op[1:]
+    _, contact_id, old_priority, new_priority = op
+    return ("priority", contact_id, new_priority, old_priority)
+
+
+def set_priority(contact_id, priority):
+    if priority > 0:
+        vip_priority_map[contact_id] = priority
+        vip_heap.update_priority(contact_id, priority)
+    else:
+        vip_priority_map.pop(contact_id, None)
+        vip_heap.remove(contact_id)
+
+
+def apply_operation(op):
+    kind = op[0]
+    if kind == "insert":
+        _, contact, priority, prev_id = op
+        contacts.insert_after(prev_id, contact)
+        if priority > 0:
+            vip_priority_map[contact[0]] = priority
+        # The category may not exist yet when the op is replayed in another worker.
+        index_contact(contact, ensure_category(contact[3]))
+    elif kind == "delete":
+        contact = op[1]
+        contacts.delete(contact)
+        unindex_contact(contact)
+    else:
+        _, contact_id, _, new_priority = op
+        set_priority(contact_id, new_priority)
+
+
+# Entries with at least this many operations (imports) are applied in bulk mode.
+BULK_OPERATION_THRESHOLD = 1000
+
+def apply_operations(ops):
+    global bulk_loading
+    if len(ops) < BULK_OPERATION_THRESHOLD:
+        for op in ops:
+            apply_operation(op)
+        return
+    bulk_loading = True
+    try:
+        for op in ops:
+            apply_operation(op)
+    finally:
+        bulk_loading = False
+        rebuild_ordered_indexes()
+
+
+def trim_journal():
+    global journal_bytes
+    depth = app.config['UNDO_HISTORY_DEPTH']
+    limit = app.config['UNDO_MEMORY_LIMIT']
+    while undo_stack and (len(undo_stack) > depth or journal_bytes > limit):
+        journal_bytes -= undo_stack.popleft().size
+
+
+# Record a new write: it becomes the most recent undo step and invalidates redo.
+def record_write(ops, next_id_before):
+    push_journal(ops, next_id_before)
+    persist_operations(ops)
+    if shared_log is not None:
+        shared_log.append("write", [ops, next_id_before, next_contact_id])
+
+
+def push_journal(ops, next_id_before):
+    global journal_bytes
+    for entry in redo_queue:
+        journal_bytes -= entry.size
+    redo_queue.clear()
+
+    entry = JournalEntry(ops, next_id_before, next_contact_id)
+    undo_stack.append(entry)
+    journal_bytes += entry.size
+    trim_journal()
+
+
+# Undo the most recent write; returns False when there is nothing to undo.
+def undo_last_write():
+    global next_contact_id
+    if not undo_stack:
+        return False
+    entry = undo_stack.pop()
+    inverse = [invert_operation(op) for op in reversed(entry.ops)]
+    apply_operations(inverse)
+    next_contact_id = entry.next_id_before
+    redo_queue.append(entry)
+    persist_operations(inverse)
+    return True
+
+
+# Re-apply the most recently undone write; returns False when there is none.
+def redo_last_write():
+    global next_contact_id
+    if not redo_queue:
+        return False
+    entry = redo_queue.pop()
+    apply_operations(entry.ops)
+    next_contact_id = entry.next_id_after
+    undo_stack.append(entry)
+    persist_operations(entry.ops)
+    return True
+
+
+# Copilot Prompt:
+# Replicate writes between worker processes through the shared change log.
+# Each worker replays entries it has not seen yet through the same journal
+# functions the routes use, so all workers converge on the same contacts,
+# IDs and undo/redo history. Called with store.lock held.
+# A worker starts from the latest checkpoint (see shared_state.py) when there
+# is one, so it only replays the entries appended after it.
+# Benchmark pool workers are spawned processes (benchmark_jobs.py); when this
+# file is the server's main script they import it again as __mp_main__, and
+# they must not open the server's shared log or storage.
+BENCHMARK_WORKER = __name__ == '__mp_main__'
+shared_log = None if BENCHMARK_WORKER else shared_log_from_env()
+
+def log_change(kind):
+    if shared_log is not None:
+        shared_log.append(kind)
+
+
+def catch_up():
+    global next_contact_id
+    if shared_log is None:
+        return
+    replayed = False
+    checkpoint = shared_log.pending_checkpoint()
+    if checkpoint is not None:
+        load_shared_checkpoint(*checkpoint)
+        replayed = True
+    for kind, payload in shared_log.read_new():
+        if kind == "write":
+            ops, next_id_before, next_id_after = payload
+            ops = [decode_operation(op) for op in ops]
+            apply_operations(ops)
+            next_contact_id = next_id_after
+            push_journal(ops, next_id_before)
+        elif kind == "undo":
+            undo_last_write()
+        elif kind == "redo":
+            redo_last_write()
+        replayed = True
+    if replayed:
+        after_write()
+
+
+# The checkpoint is the snapshot_store image of the current state plus the
+# undo/redo history, so undo keeps working across the compacted entries.
+def checkpoint_shared_state():
+    history = {
+        "undo": [[entry.ops, entry.next_id_before, entry.next_id_after] for entry in undo_stack],
+        "redo": [[entry.ops, entry.next_id_before, entry.next_id_after] for entry in redo_queue],
     }
+    shared_log.checkpoint(encode_snapshot(capture_snapshot()()), history)
 
 
-def restore_state(state):
-    global next_contact_id, vip_priority_map
-    contacts.from_list(state["contacts"])
-    next_contact_id = state["next_id"]
-    vip_priority_map = dict(state["vip"])
+def load_shared_checkpoint(state, history):
+    global journal_bytes
+    load_snapshot(parse_snapshot(memoryview(state)))
+    undo_stack.clear()
+    redo_queue.clear()
+    journal_bytes = 0
+    for entries, stack in ((history["undo"], undo_stack), (history["redo"], redo_queue)):
+        for ops, next_id_before, next_id_after in entries:
+            entry = JournalEntry([decode_operation(op) for op in ops], next_id_before, next_id_after)
+            stack.append(entry)
+            journal_bytes += entry.size
+
+
+# Cheap per-request check (PRAGMA data_version) for writes made by other workers.
+# If this worker's store.lock is busy the request is served from the current
+# snapshot instead of waiting: a write in progress catches up before it
+# publishes, and otherwise the next request checks again.
+@app.before_request
+def catch_up_shared_state():
+    if shared_log is None or not shared_log.changed():
+        return
+    if not store.lock.acquire(blocking=False):
+        shared_log.recheck()
+        return
+    try:
+        catch_up()
+    finally:
+        store.lock.release()
+
+
+# Copilot Prompt:
+# Mirror applied operations to the configured storage backend (CONTACT_STORAGE).
+# Writes go through a write-behind queue, so routes never wait on the database.
+storage_queue = None
+snapshot_store = None
+
+def persist_operations(ops):
+    if storage_queue is not None:
+        storage_queue.submit(ops)
+    if snapshot_store is not None and snapshot_store.append(ops, next_contact_id):
+        checkpoint_snapshot()
+
+
+# Load persisted contacts on startup; an empty database is seeded with the
+# in-memory seed contacts instead.
+def init_storage(backend):
+    global storage_queue, next_contact_id, vip_priority_map
+    if backend is None:
+        return
+    if isinstance(backend, SnapshotStore):
+        init_snapshot_store(backend)
+        return
+    backend.create_schema()
+    rows, priorities = backend.load_all()
+    rows = [Contact.from_row(row) for row in rows]
+    storage_queue = WriteBehindQueue(
+        backend,
+        batch_size=int(os.getenv('DB_BATCH_SIZE', '500')),
+        interval=float(os.getenv('DB_FLUSH_INTERVAL', '0.5'))
+    )
+    atexit.register(storage_queue.close)
+
+    if not rows:
+        persist_operations([("insert", c, vip_priority_map.get(c[0], 0), None) for c in contacts])
+        return
+
+    for category in {row[3] for row in rows}:
+        ensure_category(category)
+    contacts.from_list(rows)
+    vip_priority_map = priorities
+    next_contact_id = rows[-1][0] + 1
     rebuild_all_structures()
 
+
+# Copilot Prompt:
+# CONTACT_STORAGE=snapshot (see snapshot_store.py): start from the last binary
+# checkpoint plus the journal of operations applied after it.
+# The checkpoint holds the contacts as columns together with the index orders,
+# so load_snapshot() installs every structure in bulk (no per-contact
+# index_contact(), no sorting, no trigram extraction); only the journal tail is
+# replayed through apply_operations().
+def init_snapshot_store(backend):
+    global snapshot_store, next_contact_id
+    # The load allocates millions of objects that all stay alive; collections
+    # triggered along the way would rescan them repeatedly, so the collector
+    # is paused and the loaded objects are then moved out of its generations.
+    gc.disable()
+    try:
+        data = backend.load()
+        if data is not None:
+            load_snapshot(data)
+    finally:
+        gc.enable()
+    gc.freeze()
+    # Without a checkpoint the journal continues from the seed contacts.
+    for ops, next_id in backend.journal_entries():
+        apply_operations([decode_operation(op) for op in ops])
+        next_contact_id = next_id
+    backend.open()
+    snapshot_store = backend
+    atexit.register(backend.close)
+    if data is None:
+        checkpoint_snapshot(background=False)
+
+
+def restore_categories(pairs):
+    for name, parent in pairs:
+        node = category_tree.get_category(name)
+        if node is None:
+            node = category_tree.add_category(parent, name) or ensure_category(name)
+        if not category_bst.search(name):
+            category_bst.insert(name, node)
+
+
+def load_snapshot(data):
+    global next_contact_id, vip_priority_map
+    restore_categories(data.categories)
+    codes = [categories.code(name) for name in data.category_names]
+    if codes != list(range(len(codes))):
+        data.codes = [codes[code] for code in data.codes]
+    records = Contact.from_columns(data.ids, data.names, data.emails, data.codes)
+
+    contacts.from_list(records, data.ids)
+    contact_dict.clear()
+    contact_dict.update(zip(data.ids, records))
+    vip_priority_map = data.priorities
+    # The linked list is in ID order apart from re-inserted (undone) deletes,
+    # so this sort is a near-linear timsort pass.
+    sorted_contacts.load(data.ids, records)
+    columns = {1: data.names, 2: data.emails}
+    for prefix_index in prefix_indexes.values():
+        order = data.prefix_orders.get(prefix_index.field)
+        column = columns.get(prefix_index.field)
+        if order is not None and column is not None and len(order) == len(records):
+            prefix_index.load([data.ids[i] for i in order], [column[i] for i in order])
+        else:
+            prefix_index.rebuild(records)
+    for trigram_index in trigram_indexes.values():
+        postings = data.trigram_postings.get(trigram_index.field)
+        if postings is not None:
+            trigram_index.load(postings, len(records))
+        else:
+            trigram_index.rebuild(records)
+    groups = {code: {} for code in set(data.codes)}
+    for contact_id, code, record in zip(data.ids, data.codes, records):
+        groups[code][contact_id] = record
+    category_tree.load_groups({category_names[code]: members for code, members in groups.items()})
+    vip_heap.build(vip_priority_map.items())
+    next_contact_id = data.next_contact_id
+
+
+# Capture the state under store.lock; the returned function builds the
+# snapshot columns later, on the snapshot writer thread. Records are never
+# mutated, so only the containers are copied here.
+def capture_snapshot():
+    records = list(contacts)
+    priorities = dict(vip_priority_map)
+    hierarchy = [(node.value, node.parent.value) for node in category_tree.euler[1:]]
+    prefix_ids = {ix.field: list(ix.ids) for ix in prefix_indexes.values()}
+    postings = {ix.field: ({gram: ids[:] for gram, ids in ix.postings.items()}, set(ix.removed))
+                for ix in trigram_indexes.values()}
+    next_id = next_contact_id
+
+    def build():
+        position = {c.id: i for i, c in enumerate(records)}
+        live = {}
+        for field, (grams, removed) in postings.items():
+            if removed:
+                grams = {gram: array('q', (i for i in ids if i not in removed)) for gram, ids in grams.items()}
+                grams = {gram: ids for gram, ids in grams.items() if ids}
+            live[field] = grams
+        return SnapshotData(
+            next_id, hierarchy, list(category_names),
+            array('q', [c.id for c in records]),
+            array('I', [c.category_code for c in records]),
+            [c.name for c in records],
+            [c.email for c in records],
+            priorities,
+            {field: array('I', [position[i] for i in ids]) for field, ids in prefix_ids.items()},
+            live,
+        )
+    return build
+
+
+# Start a new journal generation and write a checkpoint of the current state.
+# Called with store.lock held (or at startup).
+def checkpoint_snapshot(background=True):
+    snapshot_store.checkpoint(capture_snapshot(), background)
+
+
+# In shared mode the change log is the persistent state; every worker starts
+# from the seed contacts and replays it.
+if shared_log is not None:
+    if os.getenv('CONTACT_STORAGE'):
+        app.logger.warning("CONTACT_STORAGE is ignored when SHARED_STATE_PATH is set")
+elif not BENCHMARK_WORKER:
+    init_storage(backend_from_env())
+
+
+# Copilot Prompt:
+# Bulk-load validated rows into every structure in one pass: linked list
+# appends, hash table, tree and heap entries are added per row, while the
+# sorted view and prefix indexes are re-sorted once at the end. The whole
+# import is recorded as a single undo entry.
+# `rows` are (name, email, category, priority) tuples from
+# bulk_io.validate_upload(), so nothing can fail half-way through the upload;
+# if applying a row fails anyway, the rows already applied are rolled back.
+# rejected/errors are the validation results, passed through to the summary.
+def import_contacts(rows, rejected=0, errors=()):
+    global next_contact_id, bulk_loading
+    next_id_before = next_contact_id
+    ops = []
+
+    bulk_loading = True
+    try:
+        for name, email, category, priority in rows:
+            ensure_category(category)
+            op = ("insert", Contact(next_contact_id, name, email, category), priority, contacts.last_key())
+            # Recorded before it is applied, so a row that fails half-way is undone too.
+            ops.append(op)
+            apply_operation(op)
+            next_contact_id += 1
+    except Exception:
+        for op in reversed(ops):
+            apply_operation(invert_operation(op))
+        next_contact_id = next_id_before
+        raise
+    finally:
+        bulk_loading = False
+        rebuild_ordered_indexes()
+
+    if ops:
+        record_write(ops, next_id_before)
+        after_write()
+
+    return {
+        "imported": len(ops),
+        "rejected": rejected,
+        "errors": list(errors),
+        "first_id": ops[0][1][0] if ops else None,
+        "last_id": ops[-1][1][0] if ops else None,
+        # Imports larger than UNDO_MEMORY_LIMIT are dropped from the history immediately.
+        "undoable": bool(ops) and bool(undo_stack) and undo_stack[-1].ops is ops,
+    }
+
+
+# The route and the CLI read and validate the upload first; only applying the
+# validated rows holds the write lock (and, in shared mode, the log's).
+apply_import = serialized_write(import_contacts)
+
+# Copilot Prompt:
+# Validate a JSON batch of operations against the current state without
+# changing anything. Items are {"op": "add", "name", "email", "category",
+# "priority"}, {"op": "delete", "id"} or {"op": "priority", "id", "priority"}.
+# Adds are given the IDs they will get when applied, so later items in the
+# same batch may delete or reprioritize them.
+# Returns (planned steps, errors); any error rejects the whole batch.
+def validate_batch(items):
+    planned = []
+    errors = []
+    added = set()
+    deleted = set()
+    next_id = next_contact_id
+
+    def live_id(item):
+        try:
+            contact_id = int(item.get("id"))
+        except (TypeError, ValueError):
+            raise ValueError("id must be an integer")
+        if contact_id in deleted or (contact_id not in contact_dict and contact_id not in added):
+            raise ValueError(f"unknown contact id {contact_id}")
+        return contact_id
+
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("operation must be an object")
+            kind = item.get("op")
+            if kind == "add":
+                name, email, category, priority = validate_contact(item)
+                planned.append(("add", next_id, name, email, category, priority))
+                added.add(next_id)
+                next_id += 1
+            elif kind == "delete":
+                contact_id = live_id(item)
+                planned.append(("delete", contact_id))
+                deleted.add(contact_id)
+            elif kind == "priority":
+                contact_id = live_id(item)
+                try:
+                    priority = int(item.get("priority"))
+                except (TypeError, ValueError):
+                    raise ValueError("priority must be an integer")
+                if priority < 0:
+                    raise ValueError("priority must be 0 or greater")
+                planned.append(("priority", contact_id, priority))
+            else:
+                raise ValueError("op must be add, delete or priority")
+        except ValueError as exc:
+            errors.append({"index": index, "error": str(exc)})
+
+    return planned, errors
+
+
+# Apply validated batch steps as one write: large batches use bulk mode (the
+# sorted indexes are re-sorted once), the batch is a single undo step, and the
+# snapshot is published once. If applying fails part-way, the applied prefix
+# is rolled back so the batch stays all-or-nothing.
+def apply_batch(planned):
+    global next_contact_id, bulk_loading
+    next_id_before = next_contact_id
+    ops = []
+
+    bulk_loading = len(planned) >= BULK_OPERATION_THRESHOLD
+    try:
+        for step in planned:
+            if step[0] == "add":
+                _, contact_id, name, email, category, priority = step
+                ensure_category(category)
+                op = ("insert", Contact(contact_id, name, email, category), priority, contacts.last_key())
+                # Recorded before it is applied, so an add that fails half-way is undone too.
+                ops.append(op)
+                apply_operation(op)
+                next_contact_id = contact_id + 1
+            elif step[0] == "delete":
+                contact = contact_dict[step[1]]
+                priority = vip_priority_map.get(contact[0], 0)
+                op = ("delete", contact, priority, contacts.delete(contact))
+                ops.append(op)
+                unindex_contact(contact)
+            else:
+                _, contact_id, priority = step
+                op = ("priority", contact_id, vip_priority_map.get(contact_id, 0), priority)
+                set_priority(contact_id, priority)
+                ops.append(op)
+    except Exception:
+        for op in reversed(ops):
+            apply_operation(invert_operation(op))
+        next_contact_id = next_id_before
+        raise
+    finally:
+        if bulk_loading:
+            bulk_loading = False
+            rebuild_ordered_indexes()
+
+    if ops:
+        record_write(ops, next_id_before)
+        after_write()
+    return ops
+
 # Copilot Prompt:
 # Create a function to recursively traverse the category tree and build a nested structure
 # for rendering in the UI, preserving hierarchy and contacts at each node.
+# Each node caches its view; only dirty nodes (those whose subtree changed)
+# are rebuilt, and clean subtrees are reused as-is. Only the first
+# TREE_CONTACTS_PER_NODE contacts are kept (the template shows no more), plus
+# the node's own contact count for the "… and N more" line.
 def build_tree_view(node):
-    return {
-        "name": node.value,
-        "contacts": node.contacts,
-        "children": [build_tree_view(child) for child in node.children]
+    if node.dirty or node.view is None:
+        node.view = {
+            "name": node.value,
+            "count": node.subtree_count,
+            "size": len(node.contacts),
+            "contacts": list(islice(node.contacts.values(), app.config['TREE_CONTACTS_PER_NODE'])),
+            "children": [build_tree_view(child) for child in node.children]
+        }
+        node.dirty = False
+    return node.view
+
+# Copilot Prompt:
+# Slice one page of the ID-ordered view instead of rendering every contact.
+# ?after=<id> is a cursor (the last ID of the previous page); otherwise ?page=N.
+def contact_page(snapshot):
+    total = len(snapshot)
+    per_page = request.args.get('per_page', type=int) or app.config['CONTACTS_PER_PAGE']
+    per_page = max(1, min(per_page, app.config['MAX_CONTACTS_PER_PAGE']))
+
+    after = request.args.get('after', type=int)
+    if after is not None:
+        start = snapshot.position_after(after)
+    else:
+        start = (max(request.args.get('page', 1, type=int), 1) - 1) * per_page
+
+    page_contacts = snapshot.records[start:start + per_page]
+    end = start + len(page_contacts)
+
+    return page_contacts, {
+        "total": total,
+        "start": start + 1 if page_contacts else 0,
+        "end": end,
+        "page": start // per_page + 1,
+        "pages": max((total + per_page - 1) // per_page, 1),
+        "per_page": per_page,
+        "prev_page": start // per_page if start > 0 else None,
+        "next_cursor": page_contacts[-1][0] if page_contacts and end < total else None,
     }
 
+
+# The VIP panel only shows the highest priorities, so read just the top k
+# entries from the heap instead of ordering all of them.
+def top_vip_contacts():
+    vip_ids_ordered = vip_heap.top_k(app.config['VIP_PANEL_SIZE'])
+    return [contact_dict[cid] for cid in vip_ids_ordered if cid in contact_dict]
+
+
+# Group the many small strings produced by Jinja's generator into larger chunks.
+def buffered_chunks(stream, size):
+    buffer = []
+    buffered = 0
+    for piece in stream:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+# Copilot Prompt:
+# Render index.html with the current page of contacts.
+# The contact list, VIP panel and tree are rendered from their own templates
+# and cached per data version (see cached_fragment); only the rest of the
+# page, which depends on the route (search results, benchmark), is rendered
+# on every request.
+# In streaming mode the template is generated incrementally and sent as a
+# chunked response, so time-to-first-byte does not depend on the contact count.
+def render_index(**context):
+    snapshot = store.snapshot
+    # Pagination links from POST routes (e.g. /benchmark) go back to the index.
+    if request.method == 'GET':
+        endpoint, view_args = request.endpoint, dict(request.view_args or {})
+    else:
+        endpoint, view_args = 'index', {}
+    page_args = {k: v for k, v in request.args.items() if k not in ('page', 'after')}
+    page_key = (endpoint, tuple(sorted(view_args.items())), tuple(sorted(request.args.items(multi=True))))
+
+    context.update(
+        contact_list=cached_fragment(snapshot, 'contacts', page_key, lambda: render_contact_list(
+            snapshot, endpoint, {**view_args, **page_args})),
+        vip_panel=cached_fragment(snapshot, 'vip', None, lambda: render_template(
+            '_vip_panel.html', vip_contacts=snapshot.vip_contacts, vip_total=snapshot.vip_total)),
+        tree_panel=cached_fragment(snapshot, 'tree', None, lambda: render_template(
+            '_category_tree.html', tree=snapshot.tree, tree_limit=app.config['TREE_CONTACTS_PER_NODE'])),
+        elapsed_time=time.time() - start_time,
+    )
+
+    stream = request.args.get('stream')
+    if stream == '1' or (stream is None and app.config['STREAM_RENDER']):
+        chunks = stream_template('index.html', **context)
+        return Response(buffered_chunks(chunks, app.config['STREAM_CHUNK_SIZE']), mimetype='text/html')
+
+    return render_template('index.html', **context)
+
+
+def render_contact_list(snapshot, endpoint, link_args):
+    page_contacts, pagination = contact_page(snapshot)
+    return render_template(
+        '_contact_list.html',
+        contacts=page_contacts,
+        pagination=pagination,
+        page_args=link_args,
+        page_endpoint=endpoint,
+    )
+
+# Publish the startup state (after replaying the shared change log, if any)
+# as the first snapshot.
+with store.lock:
+    catch_up()
+    store.publish()
+
 # ROUTES
 
 # Copilot Prompt:
-# Display all contacts by converting the linked list into a sorted list using QuickSort.
+# Display one page of contacts from the maintained ID-ordered view (no per-request sort).
 # Extract VIP contacts using a heap-based priority queue.
 # Render both full contact list and VIP subset in the UI.
+# The page carries the data version as its ETag; a refresh with a matching
+# If-None-Match is answered with 304 before anything is rendered.
 @app.route('/')
 def index():
-    contact_list = quick_sort(contacts.to_list())
-    # Copilot Prompt:
-    # Retrieve VIP contacts in true priority order using the max heap.
-    # Map heap-ordered contact IDs back to full contact records using the hash table.
-    vip_ids_ordered = vip_heap.extract_all_in_order()
-    vip_contacts = [contact_dict[cid] for cid in vip_ids_ordered if cid in contact_dict]
-    tree_data = build_tree_view(category_tree.root)
-
-    return render_template(
-    'index.html',
-    contacts=contact_list,
-    vip_contacts=vip_contacts,
-    tree=tree_data,
-    benchmark=None, 
-    elapsed_time=time.time() - start_time
-    )
+    etag = index_etag(store.snapshot)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(render_index(benchmark=None))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 # Copilot Prompt:
 # Add a new contact to the linked list and update the hash table.
 # Ensure the category exists using a BST for fast lookup.
 # If a priority is assigned, insert the contact into a heap-based VIP structure.
-# Rebuild all derived data structures after insertion to maintain consistency.
+# Only the entries for the new contact are indexed; no full rebuild is needed.
 @app.route('/add', methods=['POST'])
+@serialized_write
 def add_contact():
     global next_contact_id
 
@@ -413,26 +2143,23 @@ def add_contact():
 
     priority = int(request.form.get('priority') or 0)
 
-    undo_stack.append(snapshot_state())
-    redo_queue.clear()
-
-    new_contact = [next_contact_id, name, email, category]
+    next_id_before = next_contact_id
+    new_contact = Contact(next_contact_id, name, email, category)
+    prev_id = contacts.last_key()
     contacts.append(new_contact)
-    contact_dict[new_contact[0]] = new_contact
 
-    # Ensure category exists in BST
-    node = category_bst.search(category)
-    if not node:
-        node = category_tree.add_category("Contacts", category)
-        category_bst.insert(category, node)
+    node = ensure_category(category)
 
     if priority > 0:
         vip_priority_map[new_contact[0]] = priority
-        vip_heap.insert(new_contact[0], priority)
+
+    index_contact(new_contact, node)
 
     next_contact_id += 1
 
-    rebuild_all_structures()
+    record_write([("insert", new_contact, max(priority, 0), prev_id)], next_id_before)
+
+    after_write()
 
     return redirect(url_for('index')
     )
@@ -441,47 +2168,145 @@ def add_contact():
 # Copilot Prompt:
 # Delete a contact from the linked list and hash table using its ID.
 # Remove the contact from the VIP heap if applicable.
-# Rebuild all data structures to maintain consistency after deletion.
+# Only the deleted contact's index entries are removed.
 @app.route('/delete', methods=['POST'])
+@serialized_write
 def delete_contact():
     contact_id = int(request.form.get('id', 0))
     contact = contact_dict.get(contact_id)
 
     if contact:
-        undo_stack.append(snapshot_state())
-        redo_queue.clear()
+        priority = vip_priority_map.get(contact_id, 0)
 
-        contacts.delete(contact)
-        contact_dict.pop(contact_id, None)
+        prev_id = contacts.delete(contact)
+        unindex_contact(contact)
 
-        vip_priority_map.pop(contact_id, None)
-        vip_heap.remove(contact_id)
+        record_write([("delete", contact, priority, prev_id)], next_contact_id)
 
-        
-        rebuild_all_structures()
+        after_write()
 
     return redirect(url_for('index')
     )
 
+# Copilot Prompt:
+# Stream a CSV or JSON-lines upload into the contact store.
+# Accepts a multipart file field named "file" or the raw request body;
+# ?format=csv|jsonl overrides detection from the file name / content type.
+# Returns a JSON summary instead of rendering index.html.
+@app.route('/import', methods=['POST'])
+def import_route():
+    fmt = request.args.get('format')
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({"error": "missing file field"}), 400
+        stream, filename, mimetype = upload.stream, upload.filename, upload.mimetype
+        fmt = fmt or request.form.get('format')
+    else:
+        # Read the body as a stream; never let Flask parse it as a form.
+        stream, filename, mimetype = request.stream, None, request.mimetype
+
+    # Read and validate the whole upload before taking the write lock, so a
+    # slow client never holds up other writers and a bad file changes nothing.
+    try:
+        fmt = detect_format(fmt, filename, mimetype)
+        rows, rejected, errors = validate_upload(stream, fmt)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    summary = apply_import(rows, rejected, errors)
+    return jsonify(summary), 200 if summary["imported"] or not summary["rejected"] else 400
+
+# Copilot Prompt:
+# JSON batch API for sync jobs: POST a JSON array of operations (or
+# {"ops": [...]}); see validate_batch for the item format. The batch is applied
+# atomically as one undo step and the response is compact JSON:
+# {"applied": n, "added_ids": [...], "version": v, "undoable": bool}, or a 400
+# with per-item errors and nothing applied.
+@app.route('/api/contacts:batch', methods=['POST'])
+@serialized_write
+def contacts_batch():
+    payload = request.get_json(silent=True)
+    items = payload.get('ops') if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        return jsonify({"error": "expected a JSON array of operations or {\"ops\": [...]}"}), 400
+    if len(items) > app.config['MAX_BATCH_OPERATIONS']:
+        return jsonify({"error": f"at most {app.config['MAX_BATCH_OPERATIONS']} operations per batch"}), 413
+
+    planned, errors = validate_batch(items)
+    if errors:
+        return jsonify({"applied": 0, "errors": errors[:50], "error_count": len(errors)}), 400
+
+    ops = apply_batch(planned)
+    return jsonify({
+        "applied": len(ops),
+        "added_ids": [op[1][0] for op in ops if op[0] == "insert"],
+        "version": store.snapshot.version,
+        "undoable": bool(ops) and bool(undo_stack) and undo_stack[-1].ops is ops,
+    })
+
+# Copilot Prompt:
+# Stream all contacts as CSV (default) or JSON lines (?format=jsonl).
+# The route walks the linked list directly and yields a batch of rows at a
+# time, so memory stays constant and writers can run between batches.
+# Optional filters: ?category=<name> (that category and its subtree, via the
+# tree's Euler intervals) and ?vip=1 (only contacts with a VIP priority).
+@app.route('/export', methods=['GET'])
+def export():
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt == 'json':
+        fmt = 'jsonl'
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 400
+
+    # Stream the published snapshot (ID order, which is also list order) and
+    # copy the VIP priorities / category names under the writer lock, so the
+    # response never iterates structures a concurrent write is changing.
+    with store.lock:
+        selected = store.snapshot.records
+        priorities = dict(vip_priority_map)
+        category = request.args.get('category')
+        if category:
+            root = category_tree.get_category(category)
+            if not root:
+                return jsonify({"error": f"Unknown category: {category}"}), 404
+            names = {key for key, node in category_tree.nodes.items() if category_tree.in_subtree(root, node)}
+    if category:
+        selected = (c for c in selected if c[3].lower() in names)
+    if request.args.get('vip') == '1':
+        selected = (c for c in selected if c[0] in priorities)
+
+    return Response(
+        export_chunks(selected, priorities, fmt),
+        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        headers={"Content-Disposition": f"attachment; filename=contacts.{fmt}"}
+    )
+
+
 # Copilot Prompt:
 # Implement undo functionality using a stack.
-# Restore the previous application state and push the current state to the redo queue.
+# Apply the inverse of the most recent entry's operations (newest first)
+# and move the entry to the redo queue.
 @app.route('/undo', methods=['POST'])
+@serialized_write
 def undo():
-    if undo_stack:
-        redo_queue.append(snapshot_state())
-        restore_state(undo_stack.pop())
+    if undo_last_write():
+        log_change("undo")
+        after_write()
     return redirect(url_for('index')
     )
 
 # Copilot Prompt:
-# Implement redo functionality using a queue (FIFO).
-# Restore the next available state and push the current state back to the undo stack.
+# Implement redo functionality.
+# Re-apply the most recently undone entry and push it back to the undo stack.
+# Entries are replayed newest-undone first, since each delta depends on the
+# state left by the ones before it.
 @app.route('/redo', methods=['POST'])
+@serialized_write
 def redo():
-    if redo_queue:
-        undo_stack.append(snapshot_state())
-        restore_state(redo_queue.popleft())
+    if redo_last_write():
+        log_change("redo")
+        after_write()
     return redirect(url_for('index')
     )
 
@@ -489,13 +2314,42 @@ def redo():
 # Implement a search route that retrieves a contact by ID using binary search.
 # The route should:
 # 1. Accept a query parameter from the request
-# 2. Convert the linked list to a sorted list using quick_sort
-# 3. Use binary search to find the contact
-# 4. Render index.html with the search result displayed
+# 2. Use binary search on the maintained ID-ordered view to find the contact
+# 3. Render index.html with the search result displayed
+# With ?field=name|email&prefix=... it instead runs a case-insensitive prefix
+# query against the maintained prefix index, and with ?field=...&contains=...
+# a ranked substring/typo-tolerant query against the trigram index
+# (?limit= caps the matches and ?format=json returns them without rendering
+# the page, for autocomplete).
 
 @app.route('/search', methods=['GET'])
 def search():
     query = request.args.get('query')
+    field = request.args.get('field')
+    prefix = request.args.get('prefix')
+    contains = request.args.get('contains')
+
+    if field in prefix_indexes and (prefix or contains):
+        limit = max(1, min(request.args.get('limit', 20, type=int), app.config['MAX_CONTACTS_PER_PAGE']))
+        # The text indexes are not snapshotted; hold the writer lock for the
+        # (bounded) query so a concurrent write cannot change them mid-scan.
+        with store.lock:
+            if prefix:
+                results = [contact_dict[cid] for cid in prefix_indexes[field].search(prefix, limit)]
+            else:
+                matches = trigram_indexes[field].search(contains, contact_dict, limit)
+                results = [contact_dict[cid] for cid, _ in matches]
+
+        if request.args.get('format') == 'json':
+            return jsonify([c.to_list() for c in results])
+
+        return render_index(
+            search_query=prefix or contains,
+            search_field=field,
+            search_mode='starts with' if prefix else 'matches',
+            search_results=results,
+            benchmark=None
+        )
 
     if not query:
         return redirect(url_for('index'))
@@ -505,55 +2359,91 @@ def search():
     except ValueError:
         return redirect(url_for('index'))
 
-    # Convert to sorted list for binary search
-    sorted_contacts = quick_sort(contacts.to_list())
-
-    # Perform binary search
-    result = find_contact_by_id(sorted_contacts, query_id)
-
-    # Keep VIP and tree data consistent with index()
-    vip_ids_ordered = vip_heap.extract_all_in_order()
-    vip_contacts = [contact_dict[cid] for cid in vip_ids_ordered if cid in contact_dict]
-    tree_data = build_tree_view(category_tree.root)
+    # Perform binary search on the published snapshot
+    result = find_contact_by_id(store.snapshot, query_id)
 
-    return render_template(
-        'index.html',
-        contacts=sorted_contacts,
-        vip_contacts=vip_contacts,
-        tree=tree_data,
+    return render_index(
         search_query=query_id,
         search_result=result,
-        benchmark=None,
-        elapsed_time=time.time() - start_time
+        benchmark=None
     )
 
 # Copilot Prompt:
-# Create a Flask route that runs the benchmark module and displays results.
-# The route should:
-# 1. Call run_benchmark() from benchmark.py
-# 2. Rebuild the contact list (sorted using quick_sort)
-# 3. Extract VIP contacts using the heap
-# 4. Build the category tree view for display
-# 5. Render index.html and pass the benchmark results along with existing data
+# Create a Flask route that starts a benchmark and returns immediately.
+# The benchmark runs as a background job in a process pool (one task per
+# dataset size, in parallel); the browser is redirected to the job page.
+# Form fields: mode=search (linear vs binary search, default) or mode=suite
+# (data structure suite from benchmark_suite.py); optional sizes (comma
+# separated) and trials. Results are cached per parameters and code version.
+benchmark_jobs = BenchmarkJobs(int(os.getenv('BENCHMARK_WORKERS', '0')) or None, shared=shared_log)
+atexit.register(benchmark_jobs.shutdown)
+
+MAX_BENCHMARK_SIZE = 1_000_000
 
 @app.route('/benchmark', methods=['POST'])
 def benchmark():
-    results = run_benchmark()
+    kind = request.form.get('mode', 'search')
+    if kind not in JOB_KINDS:
+        abort(400)
+
+    try:
+        sizes = [int(x) for x in request.form.get('sizes', '').split(',') if x.strip()]
+        trials = int(request.form.get('trials') or 0) or None
+    except ValueError:
+        abort(400)
+    if len(sizes) > 6 or any(not 0 < size <= MAX_BENCHMARK_SIZE for size in sizes):
+        abort(400)
+    if trials is not None and not 0 < trials <= 10000:
+        abort(400)
 
-    contact_list = quick_sort(contacts.to_list())
-    vip_ids_ordered = vip_heap.extract_all_in_order()
-    vip_contacts = [contact_dict[cid] for cid in vip_ids_ordered if cid in contact_dict]
+    job = benchmark_jobs.submit(kind, sizes, trials)
+    return redirect(url_for('benchmark_status', job_id=job.id), code=303)
+
+# Copilot Prompt:
+# Poll a benchmark job. ?format=json returns its status (and results once
+# done); otherwise render index.html with the results or a progress notice
+# that reloads the page until the job finishes.
+@app.route('/benchmark/<job_id>', methods=['GET'])
+def benchmark_status(job_id):
+    job = benchmark_jobs.get(job_id)
+    if job is None:
+        abort(404)
+    if request.args.get('format') == 'json':
+        return jsonify(job.to_dict())
+
+    context = {'benchmark_job': job.to_dict()}
+    if job.status == 'done':
+        if job.kind == 'suite':
+            context['suite_report'] = job.result
+        else:
+            context['benchmark_results'] = job.result
 
-    tree_data = build_tree_view(category_tree.root)
+    return render_index(**context)
 
-    return render_template(
-    'index.html',
-    contacts=contact_list,
-    vip_contacts=vip_contacts,
-    tree=tree_data,
-    benchmark_results=results,
-    elapsed_time=time.time() - start_time
-)
+# Copilot Prompt:
+# Expose request latency histograms, data-structure operation counters/timers
+# and the gauges below in the Prometheus text format.
+# Gauges are read at scrape time, so they cost nothing between scrapes.
+def resident_memory_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+gauge("contacts_total", "Contacts currently stored.", lambda: len(contact_dict))
+gauge("contacts_vip_total", "Contacts with a VIP priority.", lambda: len(vip_heap))
+gauge("contacts_undo_entries", "Writes that can be undone.", lambda: len(undo_stack))
+gauge("contacts_redo_entries", "Undone writes that can be redone.", lambda: len(redo_queue))
+gauge("contacts_undo_journal_bytes", "Approximate memory held by the undo/redo journal.", lambda: journal_bytes)
+gauge("process_resident_memory_bytes", "Resident memory of this process.", resident_memory_bytes)
+gauge("process_uptime_seconds", "Seconds since the app started.", lambda: time.time() - start_time)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    if not app.config['METRICS_ENABLED']:
+        abort(404)
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -7,7 +7,7 @@
 # The module should:
 # 1. Generate a list of contacts with random names and emails.
 # 2. Implement a linear search that scans the list sequentially.
-# 3. Sort the contacts using the existing quick_sort() algorithm.
+# 3. Sort the contacts using the shared introsort in sorting.py.
 # 4. Implement binary search to locate a target contact in the sorted list.
 # 5. Measure the execution time for both search methods using time.perf_counter().
 # 6. Test multiple dataset sizes (ex: 1000, 10000, 50000 contacts).
@@ -28,23 +28,22 @@
 #
 # The module must expose a function called run_benchmark()
 # that returns the benchmark results.
+import argparse
 import random
 import string
 import time
 
+from sorting import casefold_key, introsort
 
-def quick_sort(contacts):
-
-    if len(contacts) <= 1:
-        return contacts
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the vectorized columns are reported as None without it
+    np = None
 
-    pivot = contacts[len(contacts)//2][0].lower()
 
-    left = [x for x in contacts if x[0].lower() < pivot]
-    middle = [x for x in contacts if x[0].lower() == pivot]
-    right = [x for x in contacts if x[0].lower() > pivot]
-
-    return quick_sort(left) + middle + quick_sort(right)
+# Sort by case-folded name; each key is computed once, not per comparison.
+def quick_sort(contacts):
+    return introsort(list(contacts), key=casefold_key(0))
 
 
 def generate_random_contacts(n):
@@ -73,37 +72,130 @@ def linear_search(contacts, target_name):
 
 def binary_search(contacts, target_name):
 
+    # The list is ordered by case-folded name, so search on that key. Names
+    # that differ only in case share a key and may sit in any order within
+    # its run, so find the first entry of the run and check each one.
+    target_key = target_name.casefold()
+
     low = 0
-    high = len(contacts) - 1
+    high = len(contacts)
 
-    while low <= high:
+    while low < high:
 
         mid = (low + high)//2
-        mid_name = contacts[mid][0]
-
-        if mid_name == target_name:
-            return contacts[mid]
 
-        elif mid_name < target_name:
+        if contacts[mid][0].casefold() < target_key:
             low = mid + 1
 
         else:
-            high = mid - 1
+            high = mid
+
+    while low < len(contacts) and contacts[low][0].casefold() == target_key:
+
+        if contacts[low][0] == target_name:
+            return contacts[low]
+
+        low += 1
 
     return None
 
-def run_benchmark():
 
-    results = []
+# Vectorized contact generation: all names are drawn as one (n, 8) array of
+# letter codes and viewed as fixed-width strings; emails are the lower-cased
+# codes followed by the domain. Returns (names, emails) NumPy string arrays.
+def generate_random_contacts_np(n, rng=None):
+
+    rng = rng or np.random.default_rng()
+
+    letters = np.frombuffer(string.ascii_letters.encode(), dtype=np.uint8)
+    lower = np.frombuffer(string.ascii_letters.lower().encode(), dtype=np.uint8)
+    domain = np.frombuffer(b"@example.com", dtype=np.uint8)
+
+    picks = rng.integers(0, len(letters), size=(n, 8))
+
+    names = letters[picks]
+
+    width = 8 + len(domain)
+    emails = np.empty((n, width), dtype=np.uint8)
+    emails[:, :8] = lower[picks]
+    emails[:, 8:] = domain
+
+    return names.view("S8").ravel().astype("U8"), emails.view(f"S{width}").ravel().astype(f"U{width}")
+
+
+# Build `count` lookup targets: a `hit_ratio` share of existing names, the rest
+# names that cannot exist (they contain a digit), in random order.
+def make_targets(names, count, hit_ratio=0.5):
+
+    hits = int(count * hit_ratio)
+
+    targets = random.choices(names, k=hits)
+
+    for _ in range(count - hits):
+        targets.append('0' + ''.join(random.choices(string.ascii_letters, k=7)))
+
+    random.shuffle(targets)
+
+    return targets
+
+
+# Batched binary search: one np.searchsorted call for every target.
+# Returns the index of each target in sorted_names, or -1 when missing.
+def batched_binary_search(sorted_names, targets):
 
-    dataset_sizes = [1000, 10000, 50000]
-    trials = 1000
+    positions = np.searchsorted(sorted_names, targets)
+    clipped = np.minimum(positions, len(sorted_names) - 1)
+
+    return np.where(sorted_names[clipped] == targets, clipped, -1)
+
+
+# Vectorized linear scan: one np.isin pass over the names column marks every
+# entry equal to some target, then all targets are matched against the hits
+# at once, with no Python loop per target. Returns the first matching index
+# per target, or -1.
+def batched_linear_search(names, targets):
+
+    hits = np.flatnonzero(np.isin(names, targets))
+
+    # np.unique reports the first occurrence of each name among the hits.
+    matched, first = np.unique(names[hits], return_index=True)
+
+    if matched.size == 0:
+        return np.full(len(targets), -1)
+
+    positions = np.minimum(np.searchsorted(matched, targets), matched.size - 1)
+
+    return np.where(matched[positions] == targets, hits[first[positions]], -1)
+
+
+def time_generation(size):
+
+    start = time.perf_counter()
+    generate_random_contacts(size)
+    python_time = time.perf_counter() - start
+
+    numpy_time = None
+    if np is not None:
+        start = time.perf_counter()
+        generate_random_contacts_np(size)
+        numpy_time = time.perf_counter() - start
+
+    return python_time, numpy_time
+
+
+def run_benchmark(dataset_sizes=(1000, 10000, 50000), trials=1000, hit_ratio=0.5):
+
+    results = []
 
     for size in dataset_sizes:
 
+        generate_python, generate_numpy = time_generation(size)
+
         contacts = generate_random_contacts(size)
 
-        target = random.choice(contacts)[0]
+        # A different target for every lookup, mixing hits and misses, so the
+        # timings are not the cache-hot best case of one repeated target.
+        targets = make_targets([c[0] for c in contacts], trials, hit_ratio)
 
         sorted_contacts = quick_sort(contacts)
 
@@ -111,7 +203,7 @@ def run_benchmark():
 
         start = time.perf_counter()
 
-        for _ in range(trials):
+        for target in targets:
             linear_search(contacts, target)
 
         linear_time = (time.perf_counter() - start) / trials
@@ -121,19 +213,241 @@ def run_benchmark():
 
         start = time.perf_counter()
 
-        for _ in range(trials):
+        for target in targets:
             binary_search(sorted_contacts, target)
 
         binary_time = (time.perf_counter() - start) / trials
 
 
+        # -------- NumPy batched lookups (same data and targets) --------
+
+        numpy_scan_time = numpy_binary_time = None
+
+        if np is not None:
+
+            names = np.array([c[0] for c in contacts])
+            sorted_names = np.sort(names)
+            target_array = np.array(targets)
+
+            start = time.perf_counter()
+            batched_linear_search(names, target_array)
+            numpy_scan_time = (time.perf_counter() - start) / trials
+
+            start = time.perf_counter()
+            batched_binary_search(sorted_names, target_array)
+            numpy_binary_time = (time.perf_counter() - start) / trials
+
+
         results.append({
             "size": size,
             "linear": linear_time,
-            "binary": binary_time
+            "binary": binary_time,
+            "numpy_scan": numpy_scan_time,
+            "numpy_searchsorted": numpy_binary_time,
+            "generate_python": generate_python,
+            "generate_numpy": generate_numpy,
+            "hit_ratio": hit_ratio
         })
 
     return results
 
 
-    
\ No newline at end of file
+# Compare committing each contact in its own transaction against the
+# write-behind queue's batched multi-row statements, using a temporary
+# SQLite database (Postgres can be passed in as `backend_factory`).
+def run_storage_benchmark(dataset_sizes=(1000, 10000), batch_size=500, backend_factory=None):
+    import os
+    import tempfile
+    from storage import SQLiteBackend
+
+    results = []
+
+    for size in dataset_sizes:
+
+        contacts = [[i, name, email, "Family"]
+                    for i, (name, email) in enumerate(generate_random_contacts(size), start=1)]
+
+        timings = {}
+
+        for mode in ("per_row", "batched"):
+
+            with tempfile.TemporaryDirectory() as tmp:
+
+                if backend_factory:
+                    backend = backend_factory()
+                else:
+                    backend = SQLiteBackend(os.path.join(tmp, "bench.db"))
+                backend.create_schema()
+
+                start = time.perf_counter()
+
+                if mode == "per_row":
+                    for contact in contacts:
+                        backend.write_batch([contact], [], [], [])
+                else:
+                    for i in range(0, size, batch_size):
+                        backend.write_batch(contacts[i:i + batch_size], [], [], [])
+
+                timings[mode] = time.perf_counter() - start
+
+                # Leave the shared database empty for the next run.
+                backend.write_batch([], [c[0] for c in contacts], [], [])
+                backend.close()
+
+        results.append({
+            "size": size,
+            "per_row": timings["per_row"],
+            "batched": timings["batched"],
+            "speedup": timings["per_row"] / timings["batched"]
+        })
+
+    return results
+
+
+# Cold start with CONTACT_STORAGE=snapshot: a helper process imports `size`
+# contacts into a temporary SNAPSHOT_DIR, writes a checkpoint and times a full
+# rebuild_all_structures() for comparison; then `import app` is timed in a
+# fresh process, which loads the checkpoint. app.py reads its configuration
+# at import time, so both steps run in subprocesses.
+STARTUP_BUILD = """
+import json, sys, time
+import app
+from benchmark import generate_random_contacts
+from bulk_io import validate_records
+size = int(sys.argv[1])
+rows = [{"name": name, "email": email, "category": "Family"} for name, email in generate_random_contacts(size)]
+with app.store.lock:
+    app.import_contacts(*validate_records(enumerate(rows, start=1)))
+    app.checkpoint_snapshot(background=False)
+    start = time.perf_counter()
+    app.rebuild_all_structures()
+    print(json.dumps({"rebuild": time.perf_counter() - start}))
+"""
+
+STARTUP_LOAD = """
+import json, time
+start = time.perf_counter()
+import app
+print(json.dumps({"load": time.perf_counter() - start, "contacts": len(app.contacts)}))
+"""
+
+
+def run_startup_benchmark(dataset_sizes=(100000, 1000000)):
+    import json
+    import os
+    import subprocess
+    import sys
+    import tempfile
+
+    results = []
+
+    for size in dataset_sizes:
+
+        with tempfile.TemporaryDirectory() as tmp:
+
+            env = dict(os.environ, CONTACT_STORAGE="snapshot", SNAPSHOT_DIR=tmp, UNDO_MEMORY_LIMIT="0")
+            cwd = os.path.dirname(os.path.abspath(__file__))
+
+            def run(code, *args):
+                output = subprocess.run([sys.executable, "-c", code, *args], env=env, cwd=cwd,
+                                        capture_output=True, text=True, check=True).stdout
+                return json.loads(output.strip().splitlines()[-1])
+
+            built = run(STARTUP_BUILD, str(size))
+            loaded = run(STARTUP_LOAD)
+
+            results.append({
+                "size": size,
+                "snapshot_bytes": os.path.getsize(os.path.join(tmp, "contacts.snap")),
+                "load": loaded["load"],
+                "rebuild": built["rebuild"],
+            })
+
+    return results
+
+
+# Compare introsort (plain, stable, and with a case-folded name key) against
+# the built-in sorted() on random, already-sorted and duplicate-heavy input.
+def run_sort_benchmark(dataset_sizes=(10000, 100000), trials=3):
+
+    results = []
+
+    for size in dataset_sizes:
+
+        names = [c[0] for c in generate_random_contacts(size)]
+        contacts = [[name] for name in names]
+
+        inputs = {
+            "random": names,
+            "sorted": sorted(names),
+            "duplicates": [name[:1] for name in names],
+        }
+
+        for shape, data in inputs.items():
+
+            runs = {
+                "introsort": lambda: introsort(list(data)),
+                "introsort_stable": lambda: introsort(list(data), stable=True),
+                "sorted": lambda: sorted(data),
+            }
+            if shape == "random":
+                runs["introsort_key"] = lambda: introsort(list(contacts), key=casefold_key(0))
+                runs["sorted_key"] = lambda: sorted(contacts, key=casefold_key(0))
+
+            row = {"size": size, "input": shape}
+
+            for label, run in runs.items():
+                best = float("inf")
+                for _ in range(trials):
+                    start = time.perf_counter()
+                    run()
+                    best = min(best, time.perf_counter() - start)
+                row[label] = best
+
+            results.append(row)
+
+    return results
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Search, generation, storage and startup benchmarks")
+    parser.add_argument("command", nargs="?", default="search", choices=("search", "generate", "sort", "storage", "startup"))
+    parser.add_argument("--sizes", type=int, nargs="+")
+    parser.add_argument("--trials", type=int, default=1000)
+    parser.add_argument("--hit-ratio", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    if args.command == "search":
+        for row in run_benchmark(args.sizes or (1000, 10000, 50000), args.trials, args.hit_ratio):
+            numpy_cols = ""
+            if row["numpy_scan"] is not None:
+                numpy_cols = (f", numpy isin scan {row['numpy_scan']:.2e}s"
+                              f", numpy searchsorted {row['numpy_searchsorted']:.2e}s")
+            print(f"{row['size']:>8} contacts: linear {row['linear']:.2e}s, "
+                  f"binary {row['binary']:.2e}s{numpy_cols} per lookup")
+
+    elif args.command == "generate":
+        for size in args.sizes or (100000, 1000000):
+            python_time, numpy_time = time_generation(size)
+            numpy_col = "n/a" if numpy_time is None else f"{numpy_time:.3f}s"
+            print(f"{size:>8} contacts: python {python_time:.3f}s, numpy {numpy_col}")
+
+    elif args.command == "sort":
+        for row in run_sort_benchmark(args.sizes or (10000, 100000)):
+            cols = ", ".join(f"{label} {row[label]:.3f}s" for label in row if label not in ("size", "input"))
+            print(f"{row['size']:>8} {row['input']:<10}: {cols}")
+
+    elif args.command == "startup":
+        for row in run_startup_benchmark(args.sizes or (100000, 1000000)):
+            print(f"{row['size']:>8} contacts: snapshot load (import app) {row['load']:.2f}s, "
+                  f"full rebuild {row['rebuild']:.2f}s, snapshot {row['snapshot_bytes'] / 2 ** 20:.0f} MiB")
+
+    else:
+        for row in run_storage_benchmark(args.sizes or (1000, 10000)):
+            print(f"{row['size']:>8} contacts: per-row {row['per_row']:.3f}s, "
+                  f"batched {row['batched']:.3f}s ({row['speedup']:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+# Background benchmark jobs.
+#
+# Running a benchmark inside a request ties up a web worker for seconds, so
+# POST /benchmark only submits a job and returns. Each dataset size runs as a
+# separate task in a process pool (in parallel, on other cores); the page
+# polls the job until every size has finished and the results are merged.
+#
+# Finished results are cached by (kind, sizes, trials, code version), where
+# the code version is a hash of the benchmarked source files, so viewing the
+# same benchmark again is instant until the code changes.
+#
+# With several web workers (SHARED_STATE_PATH), the worker that runs a job
+# saves its status to the shared database when it is submitted and whenever
+# one of its sizes finishes, so the job page can be polled through any worker.
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmark import run_benchmark
+from benchmark_suite import CASES, fit_exponent, run_suite
+
+SOURCE_FILES = ("app.py", "benchmark.py", "benchmark_suite.py", "benchmark_jobs.py", "sorting.py")
+MAX_JOBS = 50
+
+# kind -> (default sizes, default trials)
+JOB_KINDS = {
+    "search": ((1000, 10000, 50000), 1000),
+    "suite": ((1000, 10000, 50000), 5),
+}
+
+
+def code_version():
+    digest = hashlib.sha1()
+    base = os.path.dirname(os.path.abspath(__file__))
+    for name in SOURCE_FILES:
+        path = os.path.join(base, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+# ---------------- Worker side (runs in the pool processes) ----------------
+
+# Unset in the pool processes, so the app they import has only the in-memory
+# seed store and never opens the server's storage or shared change log.
+WORKER_UNSET_ENV = ("SHARED_STATE_PATH", "CONTACT_STORAGE")
+
+
+def _init_worker():
+    for name in WORKER_UNSET_ENV:
+        os.environ.pop(name, None)
+
+
+def run_size(kind, size, trials):
+    if kind == "search":
+        return run_benchmark(dataset_sizes=(size,), trials=trials)
+    # A worker imports its own copy of the app, so the cases that swap the
+    # module-level structures are safe to run here.
+    return run_suite(sizes=(size,), trials=trials)["results"]
+
+
+# ---------------- Web side ----------------
+
+class BenchmarkJob:
+    def __init__(self, kind, sizes, trials, key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.sizes = list(sizes)
+        self.trials = trials
+        self.key = key
+        self.created = time.time()
+        self.finished = None
+        self.futures = []
+        self.result = None
+        self.error = None
+        self.cached = False
+
+    @property
+    def status(self):
+        if self.error:
+            return "error"
+        if self.result is not None:
+            return "done"
+        if any(f.running() or f.done() for f in self.futures):
+            return "running"
+        return "queued"
+
+    def progress(self):
+        if self.result is not None:
+            return len(self.sizes), len(self.sizes)
+        return sum(f.done() for f in self.futures), len(self.sizes)
+
+    def to_dict(self):
+        done, total = self.progress()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "sizes": self.sizes,
+            "trials": self.trials,
+            "status": self.status,
+            "progress": {"done": done, "total": total},
+            "cached": self.cached,
+            "created": self.created,
+            "finished": self.finished,
+            "error": self.error,
+            "result": self.result,
+        }
+
+
+# A job submitted by another worker process, as it last saved it.
+class StoredJob:
+    def __init__(self, data):
+        self.data = data
+        self.id = data["id"]
+        self.kind = data["kind"]
+        self.status = data["status"]
+        self.result = data["result"]
+
+    def to_dict(self):
+        return self.data
+
+
+# Merge the per-size results of one job into the shape the template expects.
+def merge_results(kind, sizes, trials, parts):
+    if kind == "search":
+        return [row for part in parts for row in part]
+    rows = [row for part in parts for row in part]
+    order = {name: i for i, name in enumerate(CASES)}
+    rows.sort(key=lambda r: (order.get(r["case"], len(order)), r["size"]))
+    exponents = {}
+    for name in CASES:
+        points = [(r["size"], r["median"]) for r in rows if r["case"] == name]
+        if points:
+            exponents[name] = fit_exponent(points)
+    return {"sizes": list(sizes), "trials": trials, "results": rows, "exponents": exponents}
+
+
+class BenchmarkJobs:
+    def __init__(self, max_workers=None, shared=None):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.shared = shared
+        self.executor = None
+        self.jobs = {}
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.version = code_version()
+
+    def _pool(self):
+        if self.executor is None:
+            # Spawned, not forked: a fork of the threaded web process would
+            # inherit locks (store.lock, queue and logging locks) that another
+            # thread might be holding at that moment.
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return self.executor
+
+    def submit(self, kind, sizes=None, trials=None):
+        default_sizes, default_trials = JOB_KINDS[kind]
+        sizes = tuple(sorted(set(sizes or default_sizes)))
+        trials = trials or default_trials
+        key = (kind, sizes, trials, self.version)
+
+        with self.lock:
+            # Reuse an identical job that is still running.
+            for job in self.jobs.values():
+                if job.key == key and job.result is None and job.error is None:
+                    return job
+
+            job = BenchmarkJob(kind, sizes, trials, key)
+            if key in self.cache:
+                job.result = self.cache[key]
+                job.cached = True
+                job.finished = job.created
+            else:
+                pool = self._pool()
+                job.futures = [pool.submit(run_size, kind, size, trials) for size in sizes]
+            self.jobs[job.id] = job
+            self._trim()
+            self._save(job)
+        # Outside the lock: a callback on an already finished future runs here.
+        for future in job.futures:
+            future.add_done_callback(lambda _, job=job: self._finished(job))
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                self._collect(job)
+                return job
+        if self.shared is not None:
+            data = self.shared.load_job(job_id)
+            if data is not None:
+                return StoredJob(data)
+        return None
+
+    def _finished(self, job):
+        with self.lock:
+            self._collect(job)
+            self._save(job)
+
+    def _save(self, job):
+        if self.shared is not None:
+            self.shared.save_job(job.id, job.created, job.to_dict(), keep=MAX_JOBS)
+
+    # Called while polling: once every size has finished, merge and cache.
+    def _collect(self, job):
+        if job.result is not None or job.error or not all(f.done() for f in job.futures):
+            return
+        try:
+            parts = [f.result() for f in job.futures]
+        except Exception as exc:
+            job.error = f"{type(exc).__name__}: {exc}"
+        else:
+            job.result = merge_results(job.kind, job.sizes, job.trials, parts)
+            self.cache[job.key] = job.result
+        job.finished = time.time()
+
+    # Forget the oldest jobs beyond MAX_JOBS, finished ones first.
+    def _trim(self):
+        excess = len(self.jobs) - MAX_JOBS
+        if excess <= 0:
+            return
+        finished = [jid for jid, job in self.jobs.items() if job.result is not None or job.error]
+        for job_id in (finished + list(self.jobs))[:excess]:
+            self.jobs.pop(job_id, None)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,397 @@
+# Data structure benchmark suite for app.py.
+#
+# benchmark.py compares linear and binary search on throwaway lists. This
+# module times the structures the app actually uses, at several dataset
+# sizes, so regressions to O(n) or O(n^2) paths show up before production:
+#
+#   LinkedList append/delete, quick_sort, CategoryBST insert/search,
+#   CategoryTree find (DFS) vs get_category (indexed), MaxHeap
+#   insert/remove/extract_max/top_k, rebuild_all_structures and undo/redo.
+#
+# Each case is run `warmup` times untimed and `trials` times timed; results
+# are reported per operation (median, p95, stddev, mean, min) together with a
+# fitted complexity exponent k, where time per operation ~ size^k
+# (k ~ 0 means O(1)/O(log n) per operation, k ~ 1 means O(n)).
+#
+# CLI:
+#   python benchmark_suite.py --sizes 1000 10000 100000 --trials 7 --json results.json
+import argparse
+import json
+import math
+import random
+import statistics
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from benchmark import generate_random_contacts
+
+DEFAULT_SIZES = (1000, 10000, 50000)
+BATCH = 1000
+CATEGORIES = ["Family", "Friends", "Work", "IT", "HR", "Payroll", "Security"]
+
+
+def make_contacts(n, start=1):
+    return [[start + i, name, email, CATEGORIES[i % len(CATEGORIES)]]
+            for i, (name, email) in enumerate(generate_random_contacts(n))]
+
+
+# ---------------- Cases ----------------
+# Each case takes (app_module, size) and returns (run, cleanup, ops):
+# run() is timed, cleanup() restores the state untimed, ops is the number of
+# operations one run() performs.
+
+def case_linked_list_append(app, n):
+    ll = app.LinkedList()
+    ll.from_list(make_contacts(n))
+    batch = make_contacts(BATCH, start=n + 1)
+
+    def run():
+        for c in batch:
+            ll.append(c)
+
+    def cleanup():
+        for c in batch:
+            ll.delete(c)
+
+    return run, cleanup, BATCH
+
+
+def case_linked_list_delete(app, n):
+    ll = app.LinkedList()
+    data = make_contacts(n)
+    ll.from_list(data)
+    batch = random.sample(data, min(BATCH, n))
+
+    def run():
+        for c in batch:
+            ll.delete(c)
+
+    def cleanup():
+        for c in batch:
+            ll.append(c)
+
+    return run, cleanup, len(batch)
+
+
+def case_quick_sort(app, n):
+    data = make_contacts(n)
+    random.shuffle(data)
+    return lambda: app.quick_sort(data), None, 1
+
+
+def case_bst_insert(app, n):
+    keys = [f"category-{i:07d}" for i in range(n)]
+    random.shuffle(keys)
+
+    def run():
+        bst = app.CategoryBST()
+        for key in keys:
+            bst.insert(key, None)
+
+    return run, None, n
+
+
+def case_bst_search(app, n):
+    bst = app.CategoryBST()
+    keys = [f"category-{i:07d}" for i in range(n)]
+    bst.build_from_sorted((key, key) for key in keys)
+    targets = random.choices(keys, k=BATCH)
+
+    def run():
+        for key in targets:
+            bst.search(key)
+
+    return run, None, BATCH
+
+
+def _wide_tree(app, n):
+    tree = app.CategoryTree()
+    names = [f"Category{i}" for i in range(n)]
+    for i, name in enumerate(names):
+        parent = "Contacts" if i < 10 else names[i // 10 - 1]
+        node = app.TreeNode(name)
+        tree.get_category(parent).add_child(node)
+        tree.nodes[name.lower()] = node
+    tree.reindex()
+    return tree, names
+
+
+def case_tree_find(app, n):
+    tree, names = _wide_tree(app, n)
+    targets = random.choices(names, k=max(1, BATCH // 10))
+
+    def run():
+        for name in targets:
+            tree.root.find(name)
+
+    return run, None, len(targets)
+
+
+def case_tree_get_category(app, n):
+    tree, names = _wide_tree(app, n)
+    targets = random.choices(names, k=BATCH)
+
+    def run():
+        for name in targets:
+            tree.get_category(name)
+
+    return run, None, BATCH
+
+
+def _filled_heap(app, n):
+    heap = app.MaxHeap()
+    heap.build((i, random.randint(1, 1000)) for i in range(n))
+    return heap
+
+
+def case_heap_insert(app, n):
+    heap = _filled_heap(app, n)
+    batch = [(n + i, random.randint(1, 1000)) for i in range(BATCH)]
+
+    def run():
+        for cid, priority in batch:
+            heap.insert(cid, priority)
+
+    def cleanup():
+        for cid, _ in batch:
+            heap.remove(cid)
+
+    return run, cleanup, BATCH
+
+
+def case_heap_remove(app, n):
+    heap = _filled_heap(app, n)
+    batch = [(cid, heap.priority(cid)) for cid in random.sample(range(n), min(BATCH, n))]
+
+    def run():
+        for cid, _ in batch:
+            heap.remove(cid)
+
+    def cleanup():
+        for cid, priority in batch:
+            heap.insert(cid, priority)
+
+    return run, cleanup, len(batch)
+
+
+def case_heap_extract_max(app, n):
+    heap = _filled_heap(app, n)
+    k = min(BATCH, n)
+    extracted = []
+
+    def run():
+        for _ in range(k):
+            cid = heap.heap[0][1]
+            extracted.append((cid, -heap.heap[0][0]))
+            heap.extract_max()
+
+    def cleanup():
+        for cid, priority in extracted:
+            heap.insert(cid, priority)
+        extracted.clear()
+
+    return run, cleanup, k
+
+
+def case_heap_top_k(app, n):
+    heap = _filled_heap(app, n)
+    return lambda: heap.top_k(10), None, 1
+
+
+def case_rebuild_all_structures(app, n):
+    app.contacts.from_list(make_contacts(n))
+    app.vip_priority_map.update((i, 1) for i in range(1, n + 1, 10))
+    for category in CATEGORIES:
+        app.ensure_category(category)
+    return app.rebuild_all_structures, None, 1
+
+
+def case_undo_redo(app, n):
+    case_rebuild_all_structures(app, n)[0]()
+    app.next_contact_id = n + 1
+    client = app.app.test_client()
+    client.post('/add', data={"name": "Bench", "email": "bench@example.com", "category": "Family"})
+
+    def run():
+        client.post('/undo')
+        client.post('/redo')
+
+    return run, None, 2
+
+
+CASES = {
+    "linked_list.append": (case_linked_list_append, False),
+    "linked_list.delete": (case_linked_list_delete, False),
+    "quick_sort": (case_quick_sort, False),
+    "category_bst.insert": (case_bst_insert, False),
+    "category_bst.search": (case_bst_search, False),
+    "category_tree.find": (case_tree_find, False),
+    "category_tree.get_category": (case_tree_get_category, False),
+    "max_heap.insert": (case_heap_insert, False),
+    "max_heap.remove": (case_heap_remove, False),
+    "max_heap.extract_max": (case_heap_extract_max, False),
+    "max_heap.top_k": (case_heap_top_k, False),
+    # These two operate on app.py's module-level state and run in isolation.
+    "rebuild_all_structures": (case_rebuild_all_structures, True),
+    "undo_redo": (case_undo_redo, True),
+}
+
+
+# Swap app.py's module-level structures for empty ones while a case runs,
+# then put the originals back.
+@contextmanager
+def isolated_app_state(app):
+    names = ["contacts", "contact_dict", "sorted_contacts", "prefix_indexes", "trigram_indexes",
+             "category_tree", "category_bst", "vip_heap", "vip_priority_map", "undo_stack",
+             "redo_queue", "journal_bytes", "next_contact_id", "storage_queue", "snapshot_store",
+             "shared_log"]
+    saved = {name: getattr(app, name) for name in names}
+    try:
+        app.contacts = app.LinkedList()
+        app.contact_dict = {}
+        app.sorted_contacts = app.SortedContactView()
+        app.prefix_indexes = {field: app.PrefixIndex(ix.field) for field, ix in saved["prefix_indexes"].items()}
+        app.trigram_indexes = {field: app.TrigramIndex(ix.field) for field, ix in saved["trigram_indexes"].items()}
+        app.category_tree = app.CategoryTree()
+        app.category_bst = app.CategoryBST()
+        app.vip_heap = app.MaxHeap()
+        app.vip_priority_map = {}
+        app.undo_stack = deque()
+        app.redo_queue = deque()
+        app.journal_bytes = 0
+        app.storage_queue = None
+        app.snapshot_store = None
+        app.shared_log = None
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(app, name, value)
+        # Cases that write through the routes published snapshots of the
+        # isolated state; publish the restored one.
+        app.store.publish()
+
+
+# ---------------- Statistics ----------------
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = (len(ordered) - 1) * pct / 100
+    low = math.floor(index)
+    high = math.ceil(index)
+    return ordered[low] + (ordered[high] - ordered[low]) * (index - low)
+
+
+def summarize(samples):
+    return {
+        "median": statistics.median(samples),
+        "p95": percentile(samples, 95),
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "mean": statistics.fmean(samples),
+        "min": min(samples),
+    }
+
+
+# Least-squares slope of log(time) against log(size).
+def fit_exponent(points):
+    points = [(math.log(size), math.log(t)) for size, t in points if t > 0]
+    if len(points) < 2:
+        return None
+    mean_x = statistics.fmean(x for x, _ in points)
+    mean_y = statistics.fmean(y for _, y in points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+# ---------------- Runner ----------------
+
+def run_case(app, name, size, trials, warmup):
+    setup, uses_app_state = CASES[name]
+    state = isolated_app_state(app) if uses_app_state else _no_isolation()
+    with state:
+        run, cleanup, ops = setup(app, size)
+        samples = []
+        for i in range(warmup + trials):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            if cleanup:
+                cleanup()
+            if i >= warmup:
+                samples.append(elapsed / ops)
+    result = {"case": name, "size": size, "ops": ops, "trials": trials}
+    result.update(summarize(samples))
+    return result
+
+
+@contextmanager
+def _no_isolation():
+    yield
+
+
+# `app_module` lets the Flask app pass itself in (it may be running as __main__).
+def run_suite(sizes=DEFAULT_SIZES, trials=5, warmup=1, cases=None, include_app_state=True,
+              seed=None, app_module=None):
+    if app_module is None:
+        import app as app_module
+    app = app_module
+
+    if seed is not None:
+        random.seed(seed)
+    names = [name for name in (cases or CASES)
+             if include_app_state or not CASES[name][1]]
+
+    results = []
+    exponents = {}
+    for name in names:
+        points = []
+        for size in sizes:
+            result = run_case(app, name, size, trials, warmup)
+            results.append(result)
+            points.append((size, result["median"]))
+        exponents[name] = fit_exponent(points)
+
+    return {
+        "sizes": list(sizes),
+        "trials": trials,
+        "warmup": warmup,
+        "results": results,
+        "exponents": exponents,
+    }
+
+
+def format_table(report):
+    lines = [f"{'case':<28}{'size':>9}{'median':>12}{'p95':>12}{'stddev':>12}  (seconds per op)"]
+    for row in report["results"]:
+        lines.append(f"{row['case']:<28}{row['size']:>9}{row['median']:>12.3e}"
+                     f"{row['p95']:>12.3e}{row['stddev']:>12.3e}")
+    lines.append("")
+    lines.append(f"{'case':<28}{'exponent k (time/op ~ n^k)':>30}")
+    for name, k in report["exponents"].items():
+        lines.append(f"{name:<28}{'n/a' if k is None else f'{k:.2f}':>30}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the data structures in app.py")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES))
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", dest="json_path", help="also write the full report to this file")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.sizes, args.trials, args.warmup, args.cases, seed=args.seed)
+    print(format_table(report))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
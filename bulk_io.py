@@ -0,0 +1,197 @@
+# Bulk import and export for the contact manager.
+#
+# Contacts are read from CSV (header: name,email,category,priority) or
+# JSON lines ({"name": ..., "email": ..., "category": ..., "priority": ...})
+# as a stream, and the whole upload is validated before anything is imported:
+# validate_upload() keeps only the validated field tuples (never the file as
+# text), and an unreadable upload (invalid UTF-8, malformed CSV) is rejected as
+# a whole. app.import_contacts() then loads the validated rows into every data
+# structure in one pass, so an import is all-or-nothing.
+#
+# Exports go the other way: export_chunks() turns an iterator of contacts into
+# CSV or JSON-lines text a batch at a time, so memory does not grow with the
+# number of contacts.
+#
+# CLI:
+#   python bulk_io.py import contacts.csv                  # in-process (persists with CONTACT_STORAGE)
+#   python bulk_io.py import contacts.jsonl --url http://localhost:5000
+import argparse
+import csv
+import io
+import json
+import sys
+
+MAX_FIELD_LENGTH = 254
+FORMATS = ("csv", "jsonl")
+
+
+# Pick the format from an explicit value, then the file name, then the content type.
+def detect_format(fmt=None, filename=None, mimetype=None):
+    if fmt:
+        fmt = fmt.lower()
+        if fmt == "json":
+            fmt = "jsonl"
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        return fmt
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson", ".json")) or "json" in (mimetype or ""):
+        return "jsonl"
+    return "csv"
+
+
+# Yield (line_number, record) pairs; a record is a dict, or the ValueError
+# raised while parsing that line. A stream that cannot be decoded or parsed
+# any further raises ValueError.
+def read_records(stream, fmt):
+    text = stream if isinstance(stream, io.TextIOBase) else io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    line_number = 0
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            for record in reader:
+                line_number = reader.line_num
+                yield line_number, record
+            return
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as exc:
+                record = ValueError(f"invalid JSON: {exc}")
+            yield line_number, record
+    except UnicodeDecodeError as exc:
+        # The decoder reads ahead of the parser, so no exact line is known.
+        raise ValueError(f"upload is not valid UTF-8: {exc.reason}") from exc
+    except csv.Error as exc:
+        raise ValueError(f"invalid CSV after line {line_number}: {exc}") from exc
+
+
+# Validate (line_number, record) pairs. Returns (rows, rejected, errors):
+# rows are (name, email, category, priority) tuples, rejected counts invalid
+# records and errors describes the first max_errors of them.
+def validate_records(records, max_errors=50):
+    rows = []
+    errors = []
+    rejected = 0
+    for line_number, record in records:
+        try:
+            rows.append(validate_contact(record))
+        except ValueError as exc:
+            rejected += 1
+            if len(errors) < max_errors:
+                errors.append({"line": line_number, "error": str(exc)})
+    return rows, rejected, errors
+
+
+# Read and validate a whole upload; raises ValueError if it is unreadable.
+def validate_upload(stream, fmt, max_errors=50):
+    return validate_records(read_records(stream, fmt), max_errors)
+
+
+# Return (name, email, category, priority) or raise ValueError.
+def validate_contact(record):
+    if isinstance(record, Exception):
+        raise record
+    name = str(record.get("name") or "").strip()
+    email = str(record.get("email") or "").strip()
+    category = str(record.get("category") or "Family").strip().title()
+    if not name:
+        raise ValueError("name is required")
+    if "@" not in email:
+        raise ValueError("email must contain '@'")
+    if max(len(name), len(email), len(category)) > MAX_FIELD_LENGTH:
+        raise ValueError(f"fields are limited to {MAX_FIELD_LENGTH} characters")
+    try:
+        priority = int(record.get("priority") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("priority must be an integer")
+    if priority < 0:
+        raise ValueError("priority must be 0 or greater")
+    return name, email, category, priority
+
+
+EXPORT_FIELDS = ["id", "name", "email", "category", "priority"]
+
+
+# Yield CSV / JSON-lines text in batches of `batch_size` contacts.
+# `priorities` maps contact ID -> VIP priority (missing means 0).
+def export_chunks(contacts, priorities, fmt, batch_size=1000):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n") if fmt == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_FIELDS)
+
+    count = 0
+    for contact in contacts:
+        row = [contact[0], contact[1], contact[2], contact[3], priorities.get(contact[0], 0)]
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, row))))
+            buffer.write("\n")
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def import_file(path, fmt=None, url=None):
+    fmt = detect_format(fmt, path)
+    if url:
+        from urllib import request as urlrequest
+        with open(path, "rb") as f:
+            req = urlrequest.Request(
+                url.rstrip("/") + f"/import?format={fmt}",
+                data=f,
+                headers={"Content-Type": "application/octet-stream",
+                         "Content-Length": str(_file_size(f))},
+                method="POST"
+            )
+            with urlrequest.urlopen(req) as resp:
+                return json.loads(resp.read())
+
+    import app
+    with open(path, "rb") as f:
+        rows, rejected, errors = validate_upload(f, fmt)
+    summary = app.apply_import(rows, rejected, errors)
+    if app.storage_queue is not None:
+        app.storage_queue.flush()
+    return summary
+
+
+def _file_size(f):
+    f.seek(0, io.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk contact import")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="import contacts from a CSV or JSONL file")
+    imp.add_argument("path")
+    imp.add_argument("--format", choices=FORMATS)
+    imp.add_argument("--url", help="POST to a running server instead of importing in-process")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = import_file(args.path, args.format, args.url)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+    return 0 if not summary["rejected"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
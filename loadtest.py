@@ -0,0 +1,366 @@
+# Load generator for app.py.
+#
+# Sends a mix of GET /, POST /add, POST /delete, GET /search, POST /undo and
+# POST /redo from `concurrency` client threads, either in-process through the
+# Flask test client or against a running server (--url, e.g. one started with
+# `gunicorn -w 4 app:app`), and reports throughput and p50/p95/p99 latency per
+# route. The dataset is first grown to --contacts contacts through
+# POST /api/contacts:batch, so both modes start from the same state.
+#
+# Requests come from a synthetic mix (--mix index=40,search_id=10,add=15,...;
+# see DEFAULT_MIX for the route names) or from a recorded log (--replay
+# log.jsonl, one {"method", "path", "form" | "json", "route"} object per line,
+# "route" being the optional report label). --record writes the requests of a
+# synthetic run in that format, so the same sequence can be replayed later.
+#
+#   python loadtest.py --contacts 100000 --concurrency 8 --requests 20000 --json run.json
+#   python loadtest.py --url http://127.0.0.1:8000 --duration 30 --baseline run.json
+#
+# In-process runs share one interpreter, so they measure the app's own cost
+# and lock contention; use --url against several workers to size a deployment.
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import string
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from benchmark import generate_random_contacts
+from benchmark_suite import percentile
+
+DEFAULT_MIX = {
+    "index": 40,
+    "page": 10,
+    "search_id": 10,
+    "search_prefix": 10,
+    "search_contains": 5,
+    "add": 15,
+    "delete": 5,
+    "undo": 3,
+    "redo": 2,
+}
+CATEGORIES = ["Family", "Friends", "Work", "IT", "HR", "Payroll", "Security"]
+SEED_BATCH = 1000
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        route, _, weight = part.partition("=")
+        route = route.strip()
+        if route not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown route {route!r} (choose from {', '.join(DEFAULT_MIX)})")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def random_letters(rng, k):
+    return "".join(rng.choices(string.ascii_letters, k=k))
+
+
+# Copilot Prompt:
+# Generate an endless synthetic request sequence for the weighted mix.
+# IDs for /delete and ID searches are drawn from 1..max_id, where max_id
+# starts at the seeded dataset size and grows with every /add, so most
+# deletes and lookups hit an existing contact.
+def synthetic_requests(mix, initial_contacts, seed=None):
+    rng = random.Random(seed)
+    routes = list(mix)
+    weights = [mix[route] for route in routes]
+    max_id = initial_contacts + 2
+    while True:
+        route = rng.choices(routes, weights)[0]
+        if route == "index":
+            request = {"method": "GET", "path": "/"}
+        elif route == "page":
+            request = {"method": "GET", "path": f"/?after={rng.randint(1, max_id)}"}
+        elif route == "search_id":
+            request = {"method": "GET", "path": f"/search?query={rng.randint(1, max_id)}"}
+        elif route == "search_prefix":
+            field = rng.choice(["name", "email"])
+            query = urlencode({"field": field, "prefix": random_letters(rng, 2).lower(), "format": "json"})
+            request = {"method": "GET", "path": f"/search?{query}"}
+        elif route == "search_contains":
+            query = urlencode({"field": "name", "contains": random_letters(rng, 4), "format": "json"})
+            request = {"method": "GET", "path": f"/search?{query}"}
+        elif route == "add":
+            name = random_letters(rng, 8)
+            max_id += 1
+            request = {"method": "POST", "path": "/add", "form": {
+                "name": name,
+                "email": name.lower() + "@example.com",
+                "category": rng.choice(CATEGORIES),
+                "priority": str(rng.choice([0, 0, 0, 1, 5])),
+            }}
+        elif route == "delete":
+            request = {"method": "POST", "path": "/delete", "form": {"id": str(rng.randint(1, max_id))}}
+        else:
+            request = {"method": "POST", "path": "/" + route}
+        request["route"] = route
+        yield request
+
+
+def read_log(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# Pass requests through, writing each one to the --record log.
+def recorded(requests, f):
+    for request in requests:
+        f.write(json.dumps(request) + "\n")
+        yield request
+
+
+def route_label(request):
+    return request.get("route") or f"{request['method']} {request['path'].split('?')[0]}"
+
+
+# Copilot Prompt:
+# Client sessions with one send(request) -> status code method.
+# The in-process session wraps a Flask test client; the HTTP session keeps a
+# persistent http.client connection per thread and does not follow redirects
+# (the 302 after a write is the response being measured).
+class TestClientSession:
+    def __init__(self, client):
+        self.client = client
+
+    def send(self, request):
+        response = self.client.open(request["path"], method=request["method"],
+                                    data=request.get("form"), json=request.get("json"))
+        response.get_data()
+        return response.status_code
+
+
+class HttpSession:
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def send(self, request):
+        headers = {}
+        body = None
+        if request.get("json") is not None:
+            body = json.dumps(request["json"])
+            headers["Content-Type"] = "application/json"
+        elif request.get("form") is not None:
+            body = urlencode(request["form"])
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.conn.request(request["method"], request["path"], body=body, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            raise
+
+
+class InProcessTarget:
+    name = "in-process"
+
+    def __init__(self):
+        import app
+        self.app = app
+
+    def session(self):
+        return TestClientSession(self.app.app.test_client())
+
+
+class HttpTarget:
+    def __init__(self, url):
+        self.name = url
+        self.url = url
+
+    def session(self):
+        return HttpSession(self.url)
+
+
+# Grow the dataset to `count` contacts with batch API requests.
+def seed_contacts(target, count, batch_size=SEED_BATCH):
+    session = target.session()
+    rows = generate_random_contacts(count)
+    for start in range(0, count, batch_size):
+        ops = [{"op": "add", "name": name, "email": email, "category": CATEGORIES[(start + i) % len(CATEGORIES)]}
+               for i, (name, email) in enumerate(rows[start:start + batch_size])]
+        status = session.send({"method": "POST", "path": "/api/contacts:batch", "json": ops})
+        if status != 200:
+            raise RuntimeError(f"seeding failed: POST /api/contacts:batch returned {status}")
+
+
+def worker(target, requests, lock, deadline, samples, errors):
+    session = target.session()
+    while True:
+        with lock:
+            request = next(requests, None)
+        if request is None or (deadline is not None and time.perf_counter() >= deadline):
+            return
+        label = route_label(request)
+        start = time.perf_counter()
+        try:
+            ok = session.send(request) < 400
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        if ok:
+            samples.setdefault(label, []).append(elapsed)
+        else:
+            errors[label] = errors.get(label, 0) + 1
+
+
+def summarize_route(latencies, errors, elapsed):
+    result = {"count": len(latencies), "errors": errors, "throughput": len(latencies) / elapsed}
+    if latencies:
+        result.update({
+            "mean_ms": 1000 * sum(latencies) / len(latencies),
+            "p50_ms": 1000 * percentile(latencies, 50),
+            "p95_ms": 1000 * percentile(latencies, 95),
+            "p99_ms": 1000 * percentile(latencies, 99),
+            "max_ms": 1000 * max(latencies),
+        })
+    return result
+
+
+# Run `requests` (an iterator of request dicts) from `concurrency` threads
+# until it is exhausted, `total` requests were sent or `duration` seconds
+# passed. Each thread keeps its own samples, merged afterwards, so recording
+# a latency takes no lock.
+def run(target, requests, concurrency=4, total=None, duration=None, warmup=0):
+    if total is not None:
+        requests = itertools.islice(requests, warmup + total)
+    requests = iter(requests)
+    lock = threading.Lock()
+
+    if warmup:
+        worker(target, itertools.islice(requests, warmup), threading.Lock(), None, {}, {})
+
+    per_thread = [({}, {}) for _ in range(concurrency)]
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+    threads = [threading.Thread(target=worker, args=(target, requests, lock, deadline, samples, errors))
+               for samples, errors in per_thread]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    samples, errors = {}, {}
+    for thread_samples, thread_errors in per_thread:
+        for label, latencies in thread_samples.items():
+            samples.setdefault(label, []).extend(latencies)
+        for label, count in thread_errors.items():
+            errors[label] = errors.get(label, 0) + count
+
+    labels = sorted(set(samples) | set(errors))
+    routes = {label: summarize_route(samples.get(label, []), errors.get(label, 0), elapsed) for label in labels}
+    overall = summarize_route([x for latencies in samples.values() for x in latencies],
+                              sum(errors.values()), elapsed)
+    return {"elapsed": elapsed, "total": overall, "routes": routes}
+
+
+def format_report(report):
+    lines = [f"{'route':<18}{'count':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    rows = list(report["routes"].items()) + [("TOTAL", report["total"])]
+    for label, row in rows:
+        timings = "".join(f"{row[key]:>10.2f}" if key in row else f"{'-':>10}"
+                          for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+        lines.append(f"{label:<18}{row['count']:>8}{row['errors']:>8}{row['throughput']:>10.1f}{timings}")
+    return "\n".join(lines)
+
+
+# Throughput and p95 of this run against a previous --json report.
+def format_comparison(report, baseline):
+    lines = []
+    rows = list(report["routes"].items()) + [("TOTAL", report["total"])]
+    for label, row in rows:
+        before = baseline["total"] if label == "TOTAL" else baseline.get("routes", {}).get(label)
+        if not before or "p95_ms" not in before or "p95_ms" not in row:
+            continue
+        lines.append(f"{label:<18} req/s {before['throughput']:.1f} -> {row['throughput']:.1f} "
+                     f"({row['throughput'] / before['throughput'] - 1:+.0%}), "
+                     f"p95 {before['p95_ms']:.2f} -> {row['p95_ms']:.2f} ms "
+                     f"({row['p95_ms'] / before['p95_ms'] - 1:+.0%})")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay request mixes against the contact manager")
+    parser.add_argument("--url", help="base URL of a running server (default: in-process test client)")
+    parser.add_argument("--contacts", type=int, default=10000, help="contacts to add before the run")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, help="requests to send (default 5000 without --duration)")
+    parser.add_argument("--duration", type=float, help="seconds to run")
+    parser.add_argument("--warmup", type=int, default=0, help="unmeasured requests sent first")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--replay", help="JSON-lines request log to replay instead of the synthetic mix")
+    parser.add_argument("--record", help="write the synthetic requests that were generated to this file")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    parser.add_argument("--baseline", help="compare against a report written by an earlier --json run")
+    args = parser.parse_args(argv)
+
+    if args.requests is None and args.duration is None:
+        args.requests = 5000
+
+    target = HttpTarget(args.url) if args.url else InProcessTarget()
+    random.seed(args.seed)
+    if args.contacts:
+        seed_contacts(target, args.contacts)
+
+    if args.replay:
+        requests = read_log(args.replay)
+    else:
+        requests = synthetic_requests(args.mix, args.contacts, args.seed)
+    record_file = open(args.record, "w", encoding="utf-8") if args.record else None
+    if record_file:
+        requests = recorded(requests, record_file)
+
+    try:
+        report = run(target, requests, args.concurrency, args.requests, args.duration, args.warmup)
+    finally:
+        if record_file:
+            record_file.close()
+
+    report["config"] = {
+        "target": target.name,
+        "contacts": args.contacts,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "workload": args.replay or args.mix,
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime()),
+    }
+
+    print(f"{report['total']['count']} requests in {report['elapsed']:.2f}s "
+          f"against {target.name}, concurrency {args.concurrency}")
+    print(format_report(report))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            print(format_comparison(report, json.load(f)))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["total"]["errors"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# Request and data-structure instrumentation, exposed in the Prometheus text
+# format at /metrics.
+#
+# Enabled with METRICS_ENABLED=1. The switch is read once at import time:
+# when it is off, timed() returns the decorated function itself and
+# instrument_app() registers no hooks, so disabled instrumentation costs
+# nothing on the hot paths.
+import functools
+import os
+from bisect import bisect_left
+import threading
+import time
+
+ENABLED = os.getenv('METRICS_ENABLED', '0') == '1'
+
+# Request latency buckets in seconds.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self.new_child())
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self.children.items()):
+            lines.extend(self.render_child(values, child))
+        return lines
+
+
+class CounterChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def new_child(self):
+        return CounterChild()
+
+    def render_child(self, values, child):
+        yield f"{self.name}{format_labels(self.labelnames, values)} {format_value(child.value)}"
+
+
+# A gauge is read from a callback when /metrics is scraped, so nothing has to
+# be updated on the write path.
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, read):
+        super().__init__(name, help)
+        self.read = read
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}",
+                f"{self.name} {format_value(self.read())}"]
+
+
+# Summary without quantiles: an operation count and the total time spent.
+class SummaryChild:
+    __slots__ = ("count", "sum", "lock")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.count += 1
+            self.sum += value
+
+
+class Summary(Metric):
+    kind = "summary"
+
+    def new_child(self):
+        return SummaryChild()
+
+    def render_child(self, values, child):
+        labels = format_labels(self.labelnames, values)
+        yield f"{self.name}_count{labels} {child.count}"
+        yield f"{self.name}_sum{labels} {format_value(child.sum)}"
+
+
+class HistogramChild:
+    __slots__ = ("bounds", "buckets", "count", "sum", "lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.bounds, value)
+        with self.lock:
+            if i < len(self.buckets):
+                self.buckets[i] += 1
+            self.count += 1
+            self.sum += value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.bounds = tuple(buckets)
+
+    def new_child(self):
+        return HistogramChild(self.bounds)
+
+    def render_child(self, values, child):
+        cumulative = 0
+        for bound, hits in zip(child.bounds, child.buckets):
+            cumulative += hits
+            yield f"{self.name}_bucket{format_labels(self.labelnames, values, [('le', format_value(bound))])} {cumulative}"
+        yield f"{self.name}_bucket{format_labels(self.labelnames, values, [('le', '+Inf')])} {child.count}"
+        labels = format_labels(self.labelnames, values)
+        yield f"{self.name}_count{labels} {child.count}"
+        yield f"{self.name}_sum{labels} {format_value(child.sum)}"
+
+
+registry = []
+
+
+def register(metric):
+    registry.append(metric)
+    return metric
+
+
+request_seconds = register(Histogram(
+    "contacts_http_request_duration_seconds", "Time to produce a response, per route.",
+    ("method", "route")))
+requests_total = register(Counter(
+    "contacts_http_requests_total", "Requests handled, per route and status.",
+    ("method", "route", "status")))
+operation_seconds = register(Summary(
+    "contacts_structure_operation_seconds", "Calls to and time spent in data-structure operations.",
+    ("structure", "operation")))
+
+
+def gauge(name, help, read):
+    return register(Gauge(name, help, read))
+
+
+def render():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Decorator counting and timing every call of a data-structure operation.
+def timed(structure, operation):
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        stat = operation_seconds.labels(structure, operation)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stat.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+# Time every request from before_request to after_request, labelled by the
+# matched URL rule (not the raw path) so routes with parameters share a series.
+# For streamed responses this is the time until the response starts.
+def instrument_app(app):
+    if not ENABLED:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            request_seconds.labels(request.method, route).observe(time.perf_counter() - start)
+            requests_total.labels(request.method, route, str(response.status_code)).inc()
+        return response
@@ -0,0 +1,103 @@
+# Compact contact records.
+#
+# A contact used to be a list [id, name, email, category]: a list object plus
+# a separate item array per contact, and a separate category string per
+# contact (form and import values are .title()d into new strings). Contact is
+# a __slots__ record instead, with the category stored as a small int code
+# into one shared CategoryTable, so each category name exists once.
+#
+# Contact still behaves like the old list where the code and templates rely
+# on it: contact[0..3] (id, name, email, category), iteration / list(contact)
+# and equality with other records or rows.
+
+
+class CategoryTable:
+    def __init__(self):
+        self.names = []
+        self.codes = {}
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def name(self, code):
+        return self.names[code]
+
+
+categories = CategoryTable()
+category_names = categories.names
+
+
+class Contact:
+    __slots__ = ("id", "name", "email", "category_code")
+
+    def __init__(self, contact_id, name, email, category):
+        self.id = contact_id
+        self.name = name
+        self.email = email
+        self.category_code = categories.code(category)
+
+    @classmethod
+    def from_row(cls, row):
+        return row if isinstance(row, cls) else cls(row[0], row[1], row[2], row[3])
+
+    # Bulk constructor for columns read from a snapshot (codes are already
+    # codes in `categories`).
+    @classmethod
+    def from_columns(cls, ids, names, emails, codes):
+        new = cls.__new__
+        records = []
+        append = records.append
+        for contact_id, name, email, code in zip(ids, names, emails, codes):
+            record = new(cls)
+            record.id = contact_id
+            record.name = name
+            record.email = email
+            record.category_code = code
+            append(record)
+        return records
+
+    @property
+    def category(self):
+        return category_names[self.category_code]
+
+    def __getitem__(self, index):
+        if index == 0:
+            return self.id
+        if index == 1:
+            return self.name
+        if index == 2:
+            return self.email
+        if index == 3 or index == -1:
+            return category_names[self.category_code]
+        if isinstance(index, slice):
+            return self.to_list()[index]
+        raise IndexError("contact index out of range")
+
+    def __len__(self):
+        return 4
+
+    def __iter__(self):
+        yield self.id
+        yield self.name
+        yield self.email
+        yield category_names[self.category_code]
+
+    def to_list(self):
+        return [self.id, self.name, self.email, category_names[self.category_code]]
+
+    def __eq__(self, other):
+        if isinstance(other, Contact):
+            return (self.id == other.id and self.name == other.name and self.email == other.email
+                    and self.category_code == other.category_code)
+        if isinstance(other, (list, tuple)):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Contact({self.id!r}, {self.name!r}, {self.email!r}, {self.category!r})"
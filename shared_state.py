@@ -0,0 +1,204 @@
+# Shared contact state for running several worker processes (e.g.
+# `gunicorn -w 4 app:app`).
+#
+# Every worker keeps its own in-memory structures and serves reads from them,
+# so reads scale with the number of processes. Writes are replicated through
+# an append-only change log in a SQLite database (WAL mode) that all workers
+# open:
+#
+#   - a write takes the database's write lock (BEGIN IMMEDIATE), which
+#     serializes writers across processes, first replays any entries it has
+#     not seen, then applies its own change and appends it to the log;
+#   - every entry is ("write", [ops, next_id_before, next_id_after]),
+#     ("undo", None) or ("redo", None), and replaying the same entries in the
+#     same order gives every worker the same contacts, next_contact_id and
+#     undo/redo history;
+#   - before handling a request a worker checks PRAGMA data_version, which
+#     changes only when another connection has committed, so the check is a
+#     cheap change notification and the catch-up reads only the new entries.
+#
+# The log is compacted: every SHARED_CHECKPOINT_OPS entries the writer stores a
+# checkpoint of the full state at its seq (a snapshot_store image plus the
+# undo/redo history) and deletes the entries up to the previous checkpoint.
+# A starting worker loads the latest checkpoint and replays only what follows
+# it; a running worker that is still behind the deleted entries does the same.
+#
+# Benchmark jobs (benchmark_jobs.py) are saved to the same database, so any
+# worker can answer /benchmark/<job_id> for a job another worker runs.
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SharedChangeLog:
+    def __init__(self, path, checkpoint_ops=20000):
+        self.path = path
+        self.checkpoint_ops = checkpoint_ops
+        self.seq = 0
+        self.checkpoint_seq = 0
+        self.data_version = None
+        # Each connection has its own lock: the log connection's is held for a
+        # whole write (transaction()), so the per-request change check and the
+        # benchmark job table use separate connections that never wait on it.
+        self.lock = threading.RLock()
+        self.watch_lock = threading.Lock()
+        self.jobs_lock = threading.Lock()
+        self.conns = {}
+
+    # Connections are opened lazily per process, so a log created before a
+    # pre-forking server forks is never shared between workers.
+    def connection(self, role="log"):
+        pid, conn = self.conns.get(role, (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.conns[role] = (os.getpid(), conn)
+            if role != "log":
+                # Creating a missing table needs the write lock, which a
+                # write in progress holds; the log connection creates them.
+                self.connection()
+                return conn
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS change_log ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT)"
+            )
+            # truncated: the change_log entries up to this seq have been deleted.
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoint ("
+                "seq INTEGER PRIMARY KEY, truncated INTEGER NOT NULL, state BLOB NOT NULL, history TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS benchmark_jobs ("
+                "id TEXT PRIMARY KEY, created REAL NOT NULL, data TEXT NOT NULL)"
+            )
+        return conn
+
+    # True when another connection may have appended entries since the last
+    # check. data_version is per connection, so this process's own commits
+    # (made on the log connection) count too; the catch-up then finds nothing.
+    def changed(self):
+        with self.watch_lock:
+            version = self.connection("watch").execute("PRAGMA data_version").fetchone()[0]
+            changed = version != self.data_version
+            self.data_version = version
+            return changed
+
+    # Make the next changed() return True, for a catch-up that was skipped
+    # or cut short.
+    def recheck(self):
+        self.data_version = None
+
+    # Entries after the last one this process has seen, in log order.
+    def read_new(self):
+        with self.lock:
+            rows = self.connection().execute(
+                "SELECT seq, kind, payload FROM change_log WHERE seq > ? ORDER BY seq", (self.seq,)
+            ).fetchall()
+        if rows and rows[0][0] > self.seq + 1:
+            # Entries this process has not read were compacted in the meantime;
+            # force the next changed() so the next catch-up loads the checkpoint.
+            self.recheck()
+            return
+        for seq, kind, payload in rows:
+            yield kind, json.loads(payload) if payload is not None else None
+            self.seq = seq
+
+    # The latest checkpoint as (state, history) when this process must load it
+    # before reading the log: on first use, or when entries it has not read
+    # yet were deleted. Advances seq to the checkpoint; otherwise None.
+    def pending_checkpoint(self):
+        with self.lock:
+            # One statement, so a concurrent checkpoint cannot replace the row
+            # between reading its position and its state.
+            row = self.connection().execute(
+                "SELECT seq, state, history FROM checkpoint"
+                " WHERE seq = (SELECT max(seq) FROM checkpoint)"
+                " AND seq > :seen AND (:seen = 0 OR :seen < truncated)", {"seen": self.seq}
+            ).fetchone()
+            if row is None:
+                return None
+            seq, state, history = row
+            self.seq = self.checkpoint_seq = seq
+        return state, json.loads(history)
+
+    # True when enough entries have been appended since the last checkpoint.
+    # Must be called inside transaction().
+    def checkpoint_due(self):
+        if self.seq - self.checkpoint_seq < self.checkpoint_ops:
+            return False
+        with self.lock:
+            latest = self.connection().execute("SELECT max(seq) FROM checkpoint").fetchone()[0]
+        self.checkpoint_seq = max(self.checkpoint_seq, latest or 0)
+        return self.seq - self.checkpoint_seq >= self.checkpoint_ops
+
+    # Store the state at the current seq and delete the entries up to the
+    # previous checkpoint (workers still reading them have until the next one
+    # to catch up before they must reload). Must be called inside transaction().
+    def checkpoint(self, state, history):
+        with self.lock:
+            conn = self.connection()
+            previous = conn.execute("SELECT max(seq) FROM checkpoint").fetchone()[0] or 0
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoint (seq, truncated, state, history) VALUES (?, ?, ?, ?)",
+                (self.seq, previous, state, json.dumps(history, default=list))
+            )
+            conn.execute("DELETE FROM checkpoint WHERE seq < ?", (self.seq,))
+            conn.execute("DELETE FROM change_log WHERE seq <= ?", (previous,))
+            self.checkpoint_seq = self.seq
+
+    def save_job(self, job_id, created, data, keep=50):
+        with self.jobs_lock:
+            conn = self.connection("jobs")
+            conn.execute(
+                "INSERT OR REPLACE INTO benchmark_jobs (id, created, data) VALUES (?, ?, ?)",
+                (job_id, created, json.dumps(data))
+            )
+            conn.execute(
+                "DELETE FROM benchmark_jobs WHERE id NOT IN "
+                "(SELECT id FROM benchmark_jobs ORDER BY created DESC LIMIT ?)", (keep,)
+            )
+
+    def load_job(self, job_id):
+        with self.jobs_lock:
+            row = self.connection("jobs").execute("SELECT data FROM benchmark_jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # Hold the cross-process write lock for the duration of the block.
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            conn = self.connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    # Must be called inside transaction().
+    def append(self, kind, payload=None):
+        with self.lock:
+            cursor = self.connection().execute(
+                "INSERT INTO change_log (kind, payload) VALUES (?, ?)",
+                # Records (e.g. records.Contact) are written as their field lists.
+                (kind, json.dumps(payload, default=list) if payload is not None else None)
+            )
+            self.seq = cursor.lastrowid
+
+    def close(self):
+        with self.lock, self.watch_lock, self.jobs_lock:
+            for pid, conn in self.conns.values():
+                if pid == os.getpid():
+                    conn.close()
+            self.conns = {}
+
+
+def shared_log_from_env():
+    path = os.getenv('SHARED_STATE_PATH')
+    if not path:
+        return None
+    return SharedChangeLog(path, checkpoint_ops=int(os.getenv('SHARED_CHECKPOINT_OPS', '20000')))
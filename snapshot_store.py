@@ -0,0 +1,382 @@
+# On-disk checkpoint + append-only journal (CONTACT_STORAGE=snapshot).
+#
+# SNAPSHOT_DIR holds:
+#   contacts.snap      the last checkpoint: a compact binary image of the
+#                      contacts (as columns), VIP priorities, the category
+#                      hierarchy and the orders of the sorted/prefix/trigram
+#                      indexes, so loading it needs no sorting or re-indexing
+#   journal.<gen>.log  operations applied after checkpoint <gen>, as length +
+#                      CRC32 framed JSON records [ops, next_contact_id]
+#
+# Startup maps the snapshot with mmap and turns every column into a Python
+# list or array with one bulk call (array.frombytes, one decode of a string
+# blob); app.py installs those columns into its structures in bulk and then
+# replays the journal through the normal apply_operations() path.
+#
+# A checkpoint first switches appends to a new journal generation, then
+# writes the new snapshot to a temporary file and renames it over the old one.
+# A crash at any point therefore leaves a snapshot plus every journal written
+# after it. A torn record at the end of a journal (crash mid-append) is cut off
+# when the journal is read.
+import io
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from array import array
+from itertools import chain
+
+MAGIC = b"CONTACT1"
+VERSION = 1
+# magic, version, generation, next_contact_id, section count, CRC32 of the sections
+HEADER = struct.Struct("<8sIQQII")
+# tag, payload length
+SECTION = struct.Struct("<4sQ")
+COUNT = struct.Struct("<Q")
+# journal record: payload length, CRC32 of the payload
+RECORD = struct.Struct("<II")
+
+JOURNAL_NAME = re.compile(r"^journal\.(\d+)\.log$")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+# Columns of one checkpoint. Contacts are in linked-list order; category codes
+# index category_names; prefix_orders (positions into the contact columns, in
+# index order) and trigram_postings are keyed by the contact field index
+# (1 = name, 2 = email).
+class SnapshotData:
+    def __init__(self, next_contact_id, categories, category_names, ids, codes, names, emails,
+                 priorities, prefix_orders, trigram_postings, generation=0):
+        self.generation = generation
+        self.next_contact_id = next_contact_id
+        self.categories = categories
+        self.category_names = category_names
+        self.ids = ids
+        self.codes = codes
+        self.names = names
+        self.emails = emails
+        self.priorities = priorities
+        self.prefix_orders = prefix_orders
+        self.trigram_postings = trigram_postings
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def encode_strings(values):
+    text = "".join(values)
+    blob = text.encode("utf-8")
+    if len(blob) == len(text):
+        lengths = map(len, values)
+    else:
+        lengths = (len(value.encode("utf-8")) for value in values)
+    ends = array("Q")
+    total = 0
+    for length in lengths:
+        total += length
+        ends.append(total)
+    return [COUNT.pack(len(values)), ends, blob]
+
+
+def decode_strings(view):
+    count = COUNT.unpack_from(view)[0]
+    ends = array("Q")
+    ends.frombytes(view[COUNT.size:COUNT.size + 8 * count])
+    blob = bytes(view[COUNT.size + 8 * count:])
+    text = blob.decode("utf-8")
+    # ASCII text: byte offsets are character offsets, so slice the decoded string.
+    source, decode = (text, False) if len(text) == len(blob) else (blob, True)
+    values = [source[start:end] for start, end in zip(chain((0,), ends), ends)]
+    return [value.decode("utf-8") for value in values] if decode else values
+
+
+def decode_array(view, typecode):
+    values = array(typecode)
+    values.frombytes(view)
+    return values
+
+
+def encode_postings(postings):
+    grams = list(postings)
+    counts = array("Q", (len(postings[gram]) for gram in grams))
+    return encode_strings(grams) + [counts] + [postings[gram] for gram in grams]
+
+
+def decode_postings(view):
+    grams_size = section_size(view)
+    grams = decode_strings(view[:grams_size])
+    counts = decode_array(view[grams_size:grams_size + 8 * len(grams)], "Q")
+    postings = {}
+    pos = grams_size + 8 * len(grams)
+    for gram, count in zip(grams, counts):
+        end = pos + 8 * count
+        postings[gram] = decode_array(view[pos:end], "q")
+        pos = end
+    return postings
+
+
+# Byte size of an encoded string column at the start of view.
+def section_size(view):
+    count = COUNT.unpack_from(view)[0]
+    if count == 0:
+        return COUNT.size
+    last_end = COUNT.unpack_from(view, COUNT.size + 8 * (count - 1))[0]
+    return COUNT.size + 8 * count + last_end
+
+
+def snapshot_sections(data):
+    meta = {"categories": data.categories, "category_names": data.category_names}
+    yield b"META", [json.dumps(meta).encode("utf-8")]
+    yield b"IDS_", [data.ids]
+    yield b"CODE", [data.codes]
+    yield b"NAME", encode_strings(data.names)
+    yield b"MAIL", encode_strings(data.emails)
+    yield b"VIPS", [array("q", chain.from_iterable(data.priorities.items()))]
+    for field, order in data.prefix_orders.items():
+        yield b"PFX" + str(field).encode(), [order]
+    for field, postings in data.trigram_postings.items():
+        yield b"TRI" + str(field).encode(), encode_postings(postings)
+
+
+def dump_snapshot(f, data):
+    crc = 0
+    count = 0
+    f.write(b"\0" * HEADER.size)
+    for tag, parts in snapshot_sections(data):
+        header = SECTION.pack(tag, sum(memoryview(part).nbytes for part in parts))
+        crc = zlib.crc32(header, crc)
+        f.write(header)
+        for part in parts:
+            crc = zlib.crc32(part, crc)
+            f.write(part)
+        count += 1
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, VERSION, data.generation, data.next_contact_id, count, crc))
+
+
+def write_snapshot(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        dump_snapshot(f, data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(os.path.dirname(path))
+
+
+# The same image as bytes (e.g. to store it in a database); parse_snapshot()
+# reads it back from a memoryview.
+def encode_snapshot(data):
+    f = io.BytesIO()
+    dump_snapshot(f, data)
+    return f.getvalue()
+
+
+def read_snapshot(path):
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            return parse_snapshot(view)
+        finally:
+            view.release()
+
+
+def parse_snapshot(view):
+    if len(view) < HEADER.size:
+        raise SnapshotError("snapshot is truncated")
+    magic, version, generation, next_contact_id, count, crc = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise SnapshotError("not a contact snapshot (or an unsupported version)")
+    if zlib.crc32(view[HEADER.size:]) != crc:
+        raise SnapshotError("snapshot checksum mismatch")
+
+    sections = {}
+    pos = HEADER.size
+    for _ in range(count):
+        tag, length = SECTION.unpack_from(view, pos)
+        pos += SECTION.size
+        sections[tag] = view[pos:pos + length]
+        pos += length
+
+    meta = json.loads(bytes(sections[b"META"]))
+    vips = decode_array(sections[b"VIPS"], "q")
+    return SnapshotData(
+        next_contact_id,
+        [tuple(pair) for pair in meta["categories"]],
+        meta["category_names"],
+        decode_array(sections[b"IDS_"], "q"),
+        decode_array(sections[b"CODE"], "I"),
+        decode_strings(sections[b"NAME"]),
+        decode_strings(sections[b"MAIL"]),
+        dict(zip(vips[::2], vips[1::2])),
+        {int(tag[3:]): decode_array(body, "I") for tag, body in sections.items() if tag.startswith(b"PFX")},
+        {int(tag[3:]): decode_postings(body) for tag, body in sections.items() if tag.startswith(b"TRI")},
+        generation,
+    )
+
+
+def fsync_directory(path):
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# Copilot Prompt:
+# Append-only operation journal. Each record is a length + CRC32 header and
+# a JSON payload, flushed to the OS on every append (and fsynced when
+# `fsync` is set), so a crashed process loses nothing it acknowledged.
+class Journal:
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self.file = open(path, "ab")
+
+    def append(self, payload):
+        # Records (e.g. records.Contact) are written as their field lists.
+        data = json.dumps(payload, default=list, separators=(",", ":")).encode("utf-8")
+        self.file.write(RECORD.pack(len(data), zlib.crc32(data)) + data)
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+    # Yield payloads in order. A short or corrupt record ends the journal:
+    # it was being written when the process died, so it is cut off.
+    @staticmethod
+    def read(path):
+        with open(path, "r+b") as f:
+            good = 0
+            while True:
+                header = f.read(RECORD.size)
+                if len(header) < RECORD.size:
+                    break
+                length, crc = RECORD.unpack(header)
+                data = f.read(length)
+                if len(data) < length or zlib.crc32(data) != crc:
+                    break
+                good = f.tell()
+                yield json.loads(data)
+            if f.seek(0, os.SEEK_END) != good:
+                f.truncate(good)
+
+
+# Copilot Prompt:
+# Manage the snapshot file and journal generations in one directory.
+# load() returns the last checkpoint (or None); journal_entries() then yields
+# every journal record written after it; open() starts appending.
+# checkpoint(build) rotates the journal immediately (callers hold the app's
+# write lock, so no write falls between the captured state and the rotation)
+# and runs build() + write_snapshot() in a background thread.
+class SnapshotStore:
+    def __init__(self, directory, checkpoint_ops=20000, fsync=False):
+        self.directory = directory
+        self.checkpoint_ops = checkpoint_ops
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.journal = None
+        self.pending_ops = 0
+        self.writer = None
+        self.errors = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.directory, "contacts.snap")
+
+    def journal_path(self, generation):
+        return os.path.join(self.directory, f"journal.{generation}.log")
+
+    def journal_generations(self):
+        generations = []
+        for name in os.listdir(self.directory):
+            match = JOURNAL_NAME.match(name)
+            if match:
+                generations.append(int(match.group(1)))
+        return sorted(generations)
+
+    def load(self):
+        data = read_snapshot(self.snapshot_path)
+        self.generation = data.generation if data is not None else 0
+        return data
+
+    def journal_entries(self):
+        for generation in self.journal_generations():
+            if generation >= self.generation:
+                self.generation = generation
+                for ops, next_contact_id in Journal.read(self.journal_path(generation)):
+                    self.pending_ops += len(ops)
+                    yield ops, next_contact_id
+
+    def open(self):
+        with self.lock:
+            self.journal = Journal(self.journal_path(self.generation), self.fsync)
+
+    # Returns True when enough operations have accumulated for a checkpoint.
+    def append(self, ops, next_contact_id):
+        with self.lock:
+            self.journal.append([ops, next_contact_id])
+            self.pending_ops += len(ops)
+            return self.pending_ops >= self.checkpoint_ops and not self.checkpoint_running()
+
+    def checkpoint_running(self):
+        return self.writer is not None and self.writer.is_alive()
+
+    def checkpoint(self, build, background=True):
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+            if self.journal is not None:
+                self.journal.close()
+            self.journal = Journal(self.journal_path(generation), self.fsync)
+            self.pending_ops = 0
+
+        def write():
+            try:
+                data = build()
+                data.generation = generation
+                write_snapshot(self.snapshot_path, data)
+            except Exception:
+                self.errors += 1
+                raise
+            for old in self.journal_generations():
+                if old < generation:
+                    os.remove(self.journal_path(old))
+
+        self.wait()
+        if background:
+            self.writer = threading.Thread(target=write, name="snapshot-writer", daemon=True)
+            self.writer.start()
+        else:
+            write()
+
+    def wait(self):
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+    def close(self):
+        self.wait()
+        with self.lock:
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
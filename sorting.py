@@ -0,0 +1,151 @@
+# Shared sort engine for app.py and benchmark.py.
+#
+# introsort() sorts a list in place with an iterative introsort: median-of-three
+# quicksort on an explicit stack (the smaller side is always handled first, so
+# the stack stays O(log n)), switching a range to heapsort once it has been
+# partitioned more than 2*log2(n) times, and a final insertion sort pass over
+# the short runs left behind. No recursion, so adversarial input cannot hit the
+# recursion limit, and no per-level list copies.
+#
+# With a key function the keys are computed once (decorate-sort-undecorate):
+# the key list and a permutation of indices are sorted in parallel and the
+# items are put in order with a single pass at the end, so e.g. a case-folded
+# name is built once per contact instead of on every comparison.
+#
+# stable=True breaks ties by original position, so equal keys keep their
+# input order (also with reverse=True, matching sorted()).
+import math
+from operator import itemgetter
+
+SMALL_RANGE = 16
+
+
+def casefold_key(index):
+    return lambda item: item[index].casefold()
+
+
+# Keys for the app's contact records [id, name, email, category].
+CONTACT_KEYS = {
+    "id": itemgetter(0),
+    "name": casefold_key(1),
+    "email": casefold_key(2),
+}
+
+
+def introsort(items, key=None, reverse=False, stable=False):
+    n = len(items)
+    if n < 2:
+        return items
+
+    if key is None and not stable:
+        _introsort(items, None)
+    else:
+        keys = items if key is None else [key(item) for item in items]
+        if stable:
+            # Negated positions keep ties in input order once the result is reversed.
+            keys = [(k, -i if reverse else i) for i, k in enumerate(keys)]
+        perm = list(range(n))
+        _introsort(keys, perm)
+        items[:] = [items[i] for i in perm]
+
+    if reverse:
+        items.reverse()
+    return items
+
+
+def sort_contacts(contacts, by="id", reverse=False, stable=False):
+    return introsort(contacts, key=CONTACT_KEYS[by], reverse=reverse, stable=stable)
+
+
+# Sort keys[lo..hi] (inclusive) in place; perm, when given, is permuted alongside.
+def _introsort(keys, perm):
+    n = len(keys)
+    stack = [(0, n - 1, 2 * int(math.log2(n)))]
+
+    while stack:
+        lo, hi, depth = stack.pop()
+        while hi - lo >= SMALL_RANGE:
+            if depth == 0:
+                _heap_sort(keys, perm, lo, hi)
+                break
+            depth -= 1
+            p = _partition(keys, perm, lo, hi)
+            if p - lo < hi - p:
+                stack.append((p + 1, hi, depth))
+                hi = p
+            else:
+                stack.append((lo, p, depth))
+                lo = p + 1
+
+    _insertion_sort(keys, perm, 0, n - 1)
+
+
+# Hoare partition around the median of keys[lo], keys[mid], keys[hi].
+# Returns p with keys[lo..p] <= pivot <= keys[p+1..hi]; both sides non-empty.
+def _partition(keys, perm, lo, hi):
+    mid = (lo + hi) // 2
+    for a, b in ((lo, mid), (lo, hi), (mid, hi)):
+        if keys[b] < keys[a]:
+            keys[a], keys[b] = keys[b], keys[a]
+            if perm is not None:
+                perm[a], perm[b] = perm[b], perm[a]
+    pivot = keys[mid]
+
+    i, j = lo - 1, hi + 1
+    while True:
+        i += 1
+        while keys[i] < pivot:
+            i += 1
+        j -= 1
+        while pivot < keys[j]:
+            j -= 1
+        if i >= j:
+            return j
+        keys[i], keys[j] = keys[j], keys[i]
+        if perm is not None:
+            perm[i], perm[j] = perm[j], perm[i]
+
+
+def _insertion_sort(keys, perm, lo, hi):
+    for i in range(lo + 1, hi + 1):
+        k = keys[i]
+        if not k < keys[i - 1]:
+            continue
+        p = perm[i] if perm is not None else None
+        j = i - 1
+        while j >= lo and k < keys[j]:
+            keys[j + 1] = keys[j]
+            if perm is not None:
+                perm[j + 1] = perm[j]
+            j -= 1
+        keys[j + 1] = k
+        if perm is not None:
+            perm[j + 1] = p
+
+
+def _heap_sort(keys, perm, lo, hi):
+    size = hi - lo + 1
+    for root in range(size // 2 - 1, -1, -1):
+        _sift_down(keys, perm, lo, root, size)
+    for end in range(size - 1, 0, -1):
+        keys[lo], keys[lo + end] = keys[lo + end], keys[lo]
+        if perm is not None:
+            perm[lo], perm[lo + end] = perm[lo + end], perm[lo]
+        _sift_down(keys, perm, lo, 0, end)
+
+
+# Max-heap sift over keys[lo:lo+end], with root and children as offsets from lo.
+def _sift_down(keys, perm, lo, root, end):
+    while True:
+        child = 2 * root + 1
+        if child >= end:
+            return
+        if child + 1 < end and keys[lo + child] < keys[lo + child + 1]:
+            child += 1
+        if not keys[lo + root] < keys[lo + child]:
+            return
+        a, b = lo + root, lo + child
+        keys[a], keys[b] = keys[b], keys[a]
+        if perm is not None:
+            perm[a], perm[b] = perm[b], perm[a]
+        root = child
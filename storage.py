@@ -0,0 +1,318 @@
+# Persistence layer for the contact manager.
+#
+# app.py keeps every contact in memory (linked list, hash table, tree, heap).
+# This module mirrors those writes into a database so state survives a restart,
+# without making HTTP handlers wait on a database round trip per contact.
+#
+# The module provides:
+# 1. A small connection pool shared by every backend.
+# 2. A SQLite backend (local development and tests) and a Postgres backend
+#    (psycopg2, configured from the same DB_* environment variables as
+#    db-postgress.py / docker-compose.yml).
+# 3. A write-behind queue: routes submit journal operations and return
+#    immediately; a background thread coalesces them and flushes batches as
+#    multi-row INSERT ... ON CONFLICT and DELETE ... WHERE id IN (...) statements.
+#
+# Operations use the same tuples as the undo/redo journal in app.py:
+#   ("insert", contact, priority, prev_id)
+#   ("delete", contact, priority, prev_id)
+#   ("priority", contact_id, old_priority, new_priority)
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from snapshot_store import SnapshotStore
+
+
+# Copilot Prompt:
+# Implement a fixed-size connection pool. Connections are created lazily up to
+# `size` and handed out LIFO so the most recently used (warm) connection is reused.
+# A slot is only kept by a working connection: a failed connect gives its slot
+# back, and a connection that cannot be rolled back after an error is closed
+# and dropped instead of being returned to the pool.
+class ConnectionPool:
+    def __init__(self, factory, size=4):
+        self.factory = factory
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                self._discard(conn)
+                raise
+            self.idle.put(conn)
+            raise
+        self.idle.put(conn)
+
+    def _acquire(self):
+        while True:
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self.lock:
+                if self.created < self.size:
+                    self.created += 1
+                    break
+            # Wait for a connection to come back, re-checking for a free slot
+            # in case the connection being waited for is dropped instead.
+            try:
+                return self.idle.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        try:
+            return self.factory()
+        except BaseException:
+            with self.lock:
+                self.created -= 1
+            raise
+
+    def _discard(self, conn):
+        with self.lock:
+            self.created -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self.created = 0
+
+
+# Copilot Prompt:
+# Create a storage backend base class with the SQL shared by SQLite and Postgres.
+# Subclasses provide the connection factory and the parameter placeholder.
+class StorageBackend:
+    placeholder = "?"
+    # Rows per multi-row statement (keeps SQLite under its bound-variable limit).
+    rows_per_statement = 200
+
+    def __init__(self, pool_size=4):
+        self.pool = ConnectionPool(self.connect, pool_size)
+
+    def connect(self):
+        raise NotImplementedError
+
+    def create_schema(self):
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS contacts ("
+                "id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+                "email TEXT NOT NULL, category TEXT NOT NULL)"
+            )
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS vip_priorities ("
+                "id INTEGER PRIMARY KEY, priority INTEGER NOT NULL)"
+            )
+            conn.commit()
+
+    def _values(self, columns, count):
+        row = "(" + ", ".join([self.placeholder] * columns) + ")"
+        return ", ".join([row] * count)
+
+    def _chunks(self, rows):
+        step = self.rows_per_statement
+        for i in range(0, len(rows), step):
+            yield rows[i:i + step]
+
+    def _upsert(self, cur, table, columns, rows):
+        update = ", ".join(f"{c} = excluded.{c}" for c in columns[1:])
+        for chunk in self._chunks(rows):
+            cur.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES {self._values(len(columns), len(chunk))} "
+                f"ON CONFLICT (id) DO UPDATE SET {update}",
+                [value for row in chunk for value in row]
+            )
+
+    def _delete(self, cur, table, ids):
+        for chunk in self._chunks(ids):
+            marks = ", ".join([self.placeholder] * len(chunk))
+            cur.execute(f"DELETE FROM {table} WHERE id IN ({marks})", chunk)
+
+    # Apply one coalesced batch in a single transaction.
+    def write_batch(self, contact_rows, deleted_ids, priority_rows, cleared_vip_ids):
+        with self.pool.connection() as conn:
+            try:
+                cur = conn.cursor()
+                self._delete(cur, "contacts", deleted_ids)
+                self._delete(cur, "vip_priorities", cleared_vip_ids)
+                self._upsert(cur, "contacts", ("id", "name", "email", "category"), contact_rows)
+                self._upsert(cur, "vip_priorities", ("id", "priority"), priority_rows)
+                conn.commit()
+            except Exception:
+                # Never hand a connection back with the failed transaction open
+                # (Postgres would reject every later statement on it).
+                conn.rollback()
+                raise
+
+    # Returns ([[id, name, email, category], ...] ordered by id, {id: priority}).
+    def load_all(self):
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id, name, email, category FROM contacts ORDER BY id")
+            rows = [list(row) for row in cur.fetchall()]
+            cur.execute("SELECT id, priority FROM vip_priorities")
+            priorities = dict(cur.fetchall())
+        return rows, priorities
+
+    def close(self):
+        self.pool.close()
+
+
+class SQLiteBackend(StorageBackend):
+    def __init__(self, path="contacts.db", pool_size=4):
+        self.path = path
+        super().__init__(pool_size)
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+class PostgresBackend(StorageBackend):
+    placeholder = "%s"
+    rows_per_statement = 1000
+
+    def __init__(self, pool_size=4, **settings):
+        self.settings = settings or postgres_settings()
+        super().__init__(pool_size)
+
+    def connect(self):
+        import psycopg2
+        return psycopg2.connect(**self.settings)
+
+
+# Same variables and defaults as db-postgress.py.
+def postgres_settings():
+    return {
+        "user": os.getenv('DB_USER', 'student'),
+        "password": os.getenv('DB_PASSWORD', 'password123'),
+        "host": os.getenv('DB_HOST', 'localhost'),
+        "port": os.getenv('DB_PORT', '5432'),
+        "dbname": os.getenv('DB_NAME', 'default_db'),
+    }
+
+
+# Build the backend selected by CONTACT_STORAGE (sqlite | postgres | snapshot);
+# None disables persistence.
+def backend_from_env():
+    kind = os.getenv('CONTACT_STORAGE', '').lower()
+    pool_size = int(os.getenv('DB_POOL_SIZE', '4'))
+    if kind == 'snapshot':
+        return SnapshotStore(
+            os.getenv('SNAPSHOT_DIR', 'snapshot'),
+            checkpoint_ops=int(os.getenv('SNAPSHOT_INTERVAL_OPS', '20000')),
+            fsync=os.getenv('JOURNAL_FSYNC', '0') == '1'
+        )
+    if kind == 'sqlite':
+        return SQLiteBackend(os.getenv('SQLITE_PATH', 'contacts.db'), pool_size)
+    if kind == 'postgres':
+        return PostgresBackend(pool_size)
+    return None
+
+
+# Copilot Prompt:
+# Implement a write-behind queue. submit() only records the operations and
+# returns; a background thread flushes when `batch_size` contacts are pending
+# or `interval` seconds have passed. Pending writes are coalesced per contact
+# ID (latest state wins), so an add followed by a delete never reaches the database.
+class WriteBehindQueue:
+    def __init__(self, backend, batch_size=500, interval=0.5):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.interval = interval
+        self.contacts = {}
+        self.priorities = {}
+        self.cond = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.running = True
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self.thread.start()
+
+    def submit(self, ops):
+        with self.cond:
+            for op in ops:
+                kind = op[0]
+                if kind == "insert":
+                    contact, priority = op[1], op[2]
+                    self.contacts[contact[0]] = contact
+                    self.priorities[contact[0]] = priority
+                elif kind == "delete":
+                    contact_id = op[1][0]
+                    self.contacts[contact_id] = None
+                    self.priorities[contact_id] = 0
+                else:
+                    self.priorities[op[1]] = op[3]
+            if len(self.contacts) + len(self.priorities) >= self.batch_size:
+                self.cond.notify()
+
+    def pending(self):
+        with self.cond:
+            return len(self.contacts) + len(self.priorities)
+
+    def _take(self):
+        with self.cond:
+            contacts, self.contacts = self.contacts, {}
+            priorities, self.priorities = self.priorities, {}
+        return contacts, priorities
+
+    # Write everything pending now (used by the background thread, at shutdown and in benchmarks).
+    def flush(self):
+        with self.flush_lock:
+            contacts, priorities = self._take()
+            if not contacts and not priorities:
+                return 0
+            contact_rows = [list(c) for c in contacts.values() if c is not None]
+            deleted_ids = [cid for cid, c in contacts.items() if c is None]
+            priority_rows = [[cid, p] for cid, p in priorities.items() if p > 0]
+            cleared_ids = [cid for cid, p in priorities.items() if p <= 0]
+            try:
+                self.backend.write_batch(contact_rows, deleted_ids, priority_rows, cleared_ids)
+            except Exception:
+                # Put the batch back without overwriting anything submitted since.
+                with self.cond:
+                    for cid, contact in contacts.items():
+                        self.contacts.setdefault(cid, contact)
+                    for cid, priority in priorities.items():
+                        self.priorities.setdefault(cid, priority)
+                raise
+            return len(contacts) + len(priorities)
+
+    def _run(self):
+        while self.running:
+            with self.cond:
+                self.cond.wait(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                # Keep the thread alive; the failed batch was re-queued for the next flush.
+                self.errors += 1
+                time.sleep(self.interval)
+
+    def close(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify()
+        self.thread.join()
+        self.flush()
@@ -0,0 +1,119 @@
+# Concurrency stress run for app.py's contact store.
+#
+# Starts reader threads (GET /, paging, ID search, and direct snapshot reads)
+# and writer threads (add, delete, undo, redo) against the Flask app in this
+# process, then checks that:
+#   - every request succeeded,
+#   - every snapshot a reader saw was internally consistent (ID-ordered,
+#     no duplicate IDs, tree count == contact count) and versions never went
+#     backwards for a reader,
+#   - afterwards, the incremental indexes match a full rebuild, and contact
+#     IDs are unique and below next_contact_id.
+#
+#   python stress.py --readers 8 --writers 4 --seconds 10
+#
+# Exits with status 1 if any check fails.
+import argparse
+import random
+import sys
+import threading
+import time
+
+
+def check_snapshot(snapshot):
+    ids = [c[0] for c in snapshot.records]
+    if any(a >= b for a, b in zip(ids, ids[1:])):
+        return "records not strictly ID-ordered"
+    if snapshot.tree is not None and snapshot.tree["count"] != len(ids):
+        return f"tree count {snapshot.tree['count']} != {len(ids)} contacts"
+    if snapshot.vip_total < len(snapshot.vip_contacts):
+        return "VIP panel larger than the VIP total"
+    return None
+
+
+def reader(app, stop, failures, stats):
+    client = app.app.test_client()
+    last_version = 0
+    while not stop.is_set():
+        snapshot = app.store.snapshot
+        if snapshot.version < last_version:
+            failures.append(f"version went backwards: {snapshot.version} < {last_version}")
+        last_version = snapshot.version
+        problem = check_snapshot(snapshot)
+        if problem:
+            failures.append(f"snapshot {snapshot.version}: {problem}")
+
+        path = random.choice(["/", "/?page=2", "/search?query=1", f"/?after={random.randint(1, 500)}"])
+        response = client.get(path)
+        if response.status_code not in (200, 302):
+            failures.append(f"GET {path}: {response.status_code}")
+        stats["reads"] += 1
+
+
+def writer(app, stop, failures, stats):
+    client = app.app.test_client()
+    while not stop.is_set():
+        action = random.random()
+        if action < 0.5:
+            response = client.post('/add', data={
+                "name": f"Stress{random.randint(0, 10 ** 6)}",
+                "email": "stress@example.com",
+                "category": random.choice(["Family", "Friends", "Work", "Stress"]),
+                "priority": str(random.choice([0, 0, 1, 5])),
+            })
+        elif action < 0.7:
+            ids = list(app.store.snapshot.records[-50:])
+            response = client.post('/delete', data={"id": str(random.choice(ids)[0]) if ids else "0"})
+        elif action < 0.85:
+            response = client.post('/undo')
+        else:
+            response = client.post('/redo')
+        if response.status_code != 302:
+            failures.append(f"write: {response.status_code}")
+        stats["writes"] += 1
+
+
+def run(readers=8, writers=4, seconds=5.0):
+    import app
+
+    stop = threading.Event()
+    failures = []
+    stats = {"reads": 0, "writes": 0}
+
+    threads = [threading.Thread(target=reader, args=(app, stop, failures, stats)) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(app, stop, failures, stats)) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with app.store.lock:
+        if not app.check_consistency():
+            failures.append("incremental indexes differ from a full rebuild")
+        ids = [c[0] for c in app.contacts]
+        if len(ids) != len(set(ids)):
+            failures.append("duplicate contact IDs in the linked list")
+        if ids and max(ids) >= app.next_contact_id:
+            failures.append(f"next_contact_id {app.next_contact_id} <= existing ID {max(ids)}")
+
+    return stats, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent reader/writer stress run")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    stats, failures = run(args.readers, args.writers, args.seconds)
+    print(f"{stats['reads']} reads, {stats['writes']} writes, {len(failures)} failures")
+    for failure in failures[:20]:
+        print("  " + failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
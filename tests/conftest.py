@@ -0,0 +1,20 @@
+# The modules live at the repository root (there is no package), so make them
+# importable when pytest is run as `pytest` as well as `python -m pytest`.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+# app.py keeps its state in module globals; give each test empty structures
+# (benchmark_suite swaps them the same way) and restore the originals after.
+@pytest.fixture
+def app_state():
+    import app
+    from benchmark_suite import isolated_app_state
+
+    with isolated_app_state(app):
+        app.store.publish()
+        yield app
@@ -0,0 +1,112 @@
+import pytest
+
+
+def state(app):
+    return (sorted(map(tuple, app.contact_dict.values())), dict(app.vip_priority_map), app.next_contact_id,
+            len(app.undo_stack), app.store.snapshot.version)
+
+
+def post_batch(client, ops):
+    return client.post("/api/contacts:batch", json=ops)
+
+
+def seed(client):
+    response = post_batch(client, [
+        {"op": "add", "name": "Ann", "email": "ann@example.com", "category": "Work"},
+        {"op": "add", "name": "Bob", "email": "bob@example.com", "category": "Home", "priority": 3},
+    ])
+    assert response.status_code == 200
+    return response.get_json()["added_ids"]
+
+
+def test_batch_applies_as_one_undo_step(app_state):
+    app = app_state
+    client = app.app.test_client()
+    ann, bob = seed(client)
+    before = state(app)
+
+    # Later items may refer to contacts added earlier in the same batch.
+    body = post_batch(client, {"ops": [
+        {"op": "add", "name": "Cy", "email": "cy@example.com", "category": "Friends"},
+        {"op": "priority", "id": bob + 1, "priority": 5},
+        {"op": "delete", "id": ann},
+        {"op": "priority", "id": bob, "priority": 0},
+    ]}).get_json()
+
+    assert body["applied"] == 4 and body["added_ids"] == [bob + 1] and body["undoable"]
+    assert body["version"] == app.store.snapshot.version
+    assert sorted(c[1] for c in app.store.snapshot.records) == ["Bob", "Cy"]
+    assert app.vip_priority_map == {bob + 1: 5}
+    assert app.check_consistency()
+
+    client.post("/undo")
+    assert state(app)[:3] == before[:3]
+    client.post("/redo")
+    assert sorted(c[1] for c in app.store.snapshot.records) == ["Bob", "Cy"]
+    assert app.check_consistency()
+
+
+def test_invalid_item_rejects_the_whole_batch(app_state):
+    app = app_state
+    client = app.app.test_client()
+    ann, _ = seed(client)
+    before = state(app)
+
+    response = post_batch(client, [
+        {"op": "add", "name": "Cy", "email": "cy@example.com"},
+        {"op": "delete", "id": ann},
+        {"op": "delete", "id": ann},
+        {"op": "priority", "id": ann + 100, "priority": 1},
+        {"op": "rename"},
+    ])
+
+    body = response.get_json()
+    assert response.status_code == 400
+    assert body["applied"] == 0
+    assert [error["index"] for error in body["errors"]] == [2, 3, 4]
+    assert state(app) == before
+
+
+def test_oversized_and_malformed_batches(app_state):
+    app = app_state
+    client = app.app.test_client()
+    app.app.config["MAX_BATCH_OPERATIONS"], limit = 2, app.app.config["MAX_BATCH_OPERATIONS"]
+    try:
+        assert post_batch(client, [{"op": "rename"}] * 3).status_code == 413
+    finally:
+        app.app.config["MAX_BATCH_OPERATIONS"] = limit
+    assert post_batch(client, {"items": []}).status_code == 400
+    assert len(app.contact_dict) == 0
+
+
+# ensure_category runs twice per add: before the op is built (odd calls) and
+# inside apply_operation, after the contact is linked (even calls). 1200 adds
+# take the bulk path.
+@pytest.mark.parametrize("adds,fail_at", [(10, 7), (10, 8), (1200, 1999), (1200, 2000)])
+def test_failure_while_applying_rolls_back_the_batch(app_state, monkeypatch, adds, fail_at):
+    app = app_state
+    client = app.app.test_client()
+    ann, bob = seed(client)
+    before = state(app)
+
+    ensure_category = app.ensure_category
+    calls = []
+
+    def failing_ensure_category(name):
+        calls.append(name)
+        if len(calls) == fail_at:
+            raise RuntimeError("simulated failure")
+        return ensure_category(name)
+
+    ops = [{"op": "delete", "id": ann}, {"op": "priority", "id": bob, "priority": 9}]
+    ops += [{"op": "add", "name": f"N{i}", "email": f"n{i}@example.com", "category": "Work"} for i in range(adds)]
+    monkeypatch.setattr(app, "ensure_category", failing_ensure_category)
+    planned, errors = app.validate_batch(ops)
+    assert not errors
+    with pytest.raises(RuntimeError):
+        with app.store.lock:
+            app.apply_batch(planned)
+
+    assert state(app) == before
+    assert len(list(app.contacts)) == len(app.sorted_contacts) == 2
+    assert app.check_consistency()
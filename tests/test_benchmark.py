@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from benchmark import binary_search, linear_search, quick_sort
+
+
+def test_binary_search_finds_names_that_differ_only_in_case():
+    rng = random.Random(5)
+    # Many spellings of few names, so most keys have a run of several entries.
+    contacts = [["".join(rng.choice((c.lower(), c.upper())) for c in rng.choice(["ann", "bob", "cy"])), i]
+                for i in range(300)]
+    sorted_contacts = quick_sort(contacts)
+
+    for name in {c[0] for c in contacts} | {"ANN", "Bob", "cY", "dan", "", "an"}:
+        assert binary_search(sorted_contacts, name) == linear_search(sorted_contacts, name)
+        found = binary_search(sorted_contacts, name)
+        assert found is None or found[0] == name
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 50])
+def test_binary_search_matches_linear_search(size):
+    rng = random.Random(size)
+    contacts = [["".join(rng.choices("abcXYZ", k=3)), i] for i in range(size)]
+    sorted_contacts = quick_sort(contacts)
+    for name in [c[0] for c in contacts] + ["zzz", "aaa", "ABC"]:
+        assert binary_search(sorted_contacts, name) == linear_search(sorted_contacts, name)
+
+
+def test_batched_searches_match_a_per_target_scan():
+    np = pytest.importorskip("numpy")
+    from benchmark import batched_binary_search, batched_linear_search
+
+    rng = random.Random(8)
+    names = np.array(["".join(rng.choices("abAB", k=3)) for _ in range(400)])
+    targets = np.array(["".join(rng.choices("abABc", k=3)) for _ in range(300)])
+    expected = [int(np.flatnonzero(names == t)[0]) if (names == t).any() else -1 for t in targets]
+
+    assert batched_linear_search(names, targets).tolist() == expected
+    assert batched_linear_search(names, np.array(["zzz"])).tolist() == [-1]
+    sorted_names = np.sort(names)
+    found = batched_binary_search(sorted_names, targets)
+    assert [(i >= 0) for i in found] == [(i >= 0) for i in expected]
+    assert all(sorted_names[i] == t for i, t in zip(found, targets) if i >= 0)
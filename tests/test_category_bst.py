@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from app import CategoryBST, node_height
+
+
+# Returns the subtree height after checking stored heights, AVL balance and
+# key order (every key strictly between low and high).
+def check_avl(node, low=None, high=None):
+    if node is None:
+        return 0
+    assert low is None or node.key > low
+    assert high is None or node.key < high
+    left = check_avl(node.left, low, node.key)
+    right = check_avl(node.right, node.key, high)
+    assert abs(left - right) <= 1, node.key
+    assert node.height == 1 + max(left, right) == node_height(node)
+    return node.height
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_inserts_and_deletes_stay_balanced(seed):
+    rng = random.Random(seed)
+    tree = CategoryBST()
+    reference = {}
+    for step in range(2000):
+        key = f"cat{rng.randrange(300):03d}"
+        if rng.random() < 0.6:
+            tree.insert(key, step)
+            reference.setdefault(key, step)
+        else:
+            assert tree.delete(key) == reference.pop(key, None)
+        if step % 100 == 0:
+            check_avl(tree.root)
+
+    check_avl(tree.root)
+    assert len(tree) == len(reference)
+    assert list(tree) == sorted(reference.items())
+    for key, value in reference.items():
+        assert tree.search(key.upper()) == value
+    assert tree.search("missing") is None
+
+
+def test_sorted_inserts_keep_logarithmic_height():
+    tree = CategoryBST()
+    for i in range(1023):
+        tree.insert(f"cat{i:04d}", i)
+    assert check_avl(tree.root) <= 11
+    for i in range(0, 1023, 2):
+        tree.delete(f"cat{i:04d}")
+    assert check_avl(tree.root) <= 10
+    assert [key for key, _ in tree] == [f"cat{i:04d}" for i in range(1, 1023, 2)]
+
+
+def test_build_from_sorted_and_range_items():
+    tree = CategoryBST()
+    items = [(f"Cat{i:02d}", i) for i in range(50)]
+    # Duplicate keys (case-insensitive) keep the first value.
+    items.insert(11, ("cat10", "duplicate"))
+    tree.build_from_sorted(items)
+    check_avl(tree.root)
+    assert len(tree) == 50
+    assert list(tree.range_items("cat10", "cat14")) == [(f"cat{i:02d}", i) for i in range(10, 15)]
+    assert list(tree.range_items(high="cat02")) == [("cat00", 0), ("cat01", 1), ("cat02", 2)]
@@ -0,0 +1,46 @@
+import random
+
+from app import CategoryTree
+from records import Contact
+
+
+def descendants(node):
+    result = [node]
+    for child in node.children:
+        result.extend(descendants(child))
+    return result
+
+
+def test_subtree_queries_after_many_additions():
+    rng = random.Random(4)
+    tree = CategoryTree()
+    names = ["Contacts"]
+    for i in range(300):
+        parent = rng.choice(names)
+        assert tree.add_category(parent, f"Cat{i}") is not None
+        names.append(f"Cat{i}")
+        if i % 50 == 0:
+            # Queries between additions see every category added so far.
+            assert [n.value for n in tree.subtree_nodes(parent)] == [n.value for n in descendants(tree.get_category(parent))]
+
+    assert len(tree.euler) == len(names)
+    for name in rng.sample(names, 40):
+        node = tree.get_category(name)
+        expected = descendants(node)
+        assert [n.value for n in tree.subtree_nodes(name)] == [n.value for n in expected]
+        members = {id(n) for n in expected}
+        for other in tree.euler:
+            assert tree.in_subtree(node, other) == (id(other) in members)
+
+
+def test_contacts_under_and_counts():
+    tree = CategoryTree()
+    tree.add_category("Contacts", "Work")
+    tree.add_category("Work", "IT")
+    tree.add_category("Contacts", "Home")
+    contacts = [Contact(1, "A", "a@x.org", "Work"), Contact(2, "B", "b@x.org", "IT"), Contact(3, "C", "c@x.org", "Home")]
+    tree.load_contacts(contacts)
+    assert sorted(c[0] for c in tree.contacts_under("Work")) == [1, 2]
+    assert tree.subtree_count("Contacts") == 3
+    assert tree.subtree_count("work") == 2
+    assert tree.subtree_nodes("missing") == []
@@ -0,0 +1,81 @@
+import io
+
+import pytest
+
+from bulk_io import validate_upload
+
+
+def csv_upload(count, tail=b""):
+    rows = b"".join(b"N%d,n%d@example.com,Work\n" % (i, i) for i in range(count))
+    return b"name,email,category\n" + rows + tail
+
+
+def state(app):
+    return (len(app.contact_dict), app.next_contact_id, len(app.store.snapshot), len(app.undo_stack),
+            app.store.snapshot.version)
+
+
+def test_invalid_utf8_rejects_the_whole_upload(app_state):
+    app = app_state
+    client = app.app.test_client()
+    client.post("/add", data={"name": "Ann", "email": "ann@example.com", "category": "Work"})
+    before = state(app)
+
+    response = client.post("/import", data=csv_upload(6000, b"Bad\xff\xfe,b@example.com,Work\n"),
+                           content_type="text/csv")
+
+    assert response.status_code == 400
+    assert "UTF-8" in response.get_json()["error"]
+    assert state(app) == before
+    assert app.check_consistency()
+
+
+def test_invalid_rows_are_reported_and_valid_rows_imported_as_one_step(app_state):
+    app = app_state
+    client = app.app.test_client()
+    body = b"name,email,category,priority\nA,a@x.org,Work,2\nB,not-an-email,Work,0\nC,c@x.org,Home,-1\nD,d@x.org,Home,0\n"
+
+    summary = client.post("/import", data=body, content_type="text/csv").get_json()
+
+    assert summary["imported"] == 2
+    assert summary["rejected"] == 2
+    assert [error["line"] for error in summary["errors"]] == [3, 4]
+    assert sorted(c[1] for c in app.store.snapshot.records) == ["A", "D"]
+    assert summary["undoable"]
+    client.post("/undo")
+    assert len(app.store.snapshot) == 0
+
+
+# ensure_category runs twice per row: before the row is built (odd calls) and
+# inside apply_operation, after the contact is linked (even calls).
+@pytest.mark.parametrize("fail_at", [2499, 2500])
+def test_failure_while_applying_rolls_back_the_applied_rows(app_state, monkeypatch, fail_at):
+    app = app_state
+    rows, _, _ = validate_upload(io.BytesIO(csv_upload(3000)), "csv")
+    before = state(app)
+
+    ensure_category = app.ensure_category
+    calls = []
+
+    def failing_ensure_category(name):
+        calls.append(name)
+        if len(calls) == fail_at:
+            raise RuntimeError("simulated failure")
+        return ensure_category(name)
+
+    monkeypatch.setattr(app, "ensure_category", failing_ensure_category)
+    with pytest.raises(RuntimeError):
+        app.apply_import(rows)
+
+    assert state(app) == before
+    assert not app.contact_dict and not list(app.contacts) and len(app.sorted_contacts) == 0
+    assert app.check_consistency()
+
+
+@pytest.mark.parametrize("fmt,body", [
+    ("csv", b"name,email\nA,a@x.org\n\xff\n"),
+    ("jsonl", b'{"name": "A", "email": "a@x.org"}\n\xc3\n'),
+])
+def test_validate_upload_raises_on_undecodable_input(fmt, body):
+    with pytest.raises(ValueError):
+        validate_upload(io.BytesIO(body), fmt)
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from app import MaxHeap
+
+
+# Highest priority first; ties go to the lower contact ID (entries compare as
+# (-priority, contact_id)).
+def expected_order(priorities):
+    return [cid for cid, _ in sorted(priorities.items(), key=lambda item: (-item[1], item[0]))]
+
+
+def check_heap(heap):
+    entries = heap.heap
+    for i in range(1, len(entries)):
+        assert entries[(i - 1) // 2] <= entries[i]
+    assert heap.pos == {cid: i for i, (_, cid) in enumerate(entries)}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_top_k_matches_sorted_after_random_updates(seed):
+    rng = random.Random(seed)
+    heap = MaxHeap()
+    reference = {}
+    for _ in range(3000):
+        cid = rng.randrange(500)
+        action = rng.random()
+        if action < 0.5:
+            priority = rng.randrange(1, 50)
+            heap.insert(cid, priority)
+            reference[cid] = priority
+        elif action < 0.75:
+            priority = rng.randrange(1, 50)
+            heap.update_priority(cid, priority)
+            reference[cid] = priority
+        else:
+            heap.remove(cid)
+            reference.pop(cid, None)
+
+    check_heap(heap)
+    order = expected_order(reference)
+    assert len(heap) == len(reference)
+    for k in (0, 1, 5, 10, 100, len(reference), len(reference) + 10):
+        assert heap.top_k(k) == order[:k]
+    assert heap.extract_all_in_order() == order
+    assert heap.get_all_in_priority_order() == order
+    for cid, priority in reference.items():
+        assert heap.priority(cid) == priority
+
+
+def test_build_then_extract_max():
+    rng = random.Random(7)
+    priorities = {cid: rng.randrange(1, 20) for cid in range(200)}
+    heap = MaxHeap()
+    heap.build(priorities.items())
+    check_heap(heap)
+    assert heap.top_k(len(priorities)) == expected_order(priorities)
+    extracted = [heap.extract_max() for _ in range(len(priorities))]
+    assert extracted == expected_order(priorities)
+    assert heap.extract_max() is None
+    assert heap.top_k(3) == []
@@ -0,0 +1,128 @@
+import random
+
+import pytest
+
+from app import PrefixIndex, TrigramIndex
+from records import Contact
+
+WORDS = ["ann", "Anna", "ANNE", "bob", "Bobby", "éva", "Eve", "ß", "strasse", "ab", "a", "x", "zoë", "o'neil"]
+
+
+def random_contacts(rng, count):
+    return [Contact(i, f"{rng.choice(WORDS)} {rng.choice(WORDS)}", f"{rng.choice(WORDS)}{i}@x.org", "Work")
+            for i in range(1, count + 1)]
+
+
+# Add and remove contacts at random; returns the live contacts by ID.
+def churn(rng, index, contacts):
+    live = {}
+    for contact in contacts:
+        index.add(contact)
+        live[contact[0]] = contact
+        if rng.random() < 0.3:
+            victim = live.pop(rng.choice(list(live)))
+            index.remove(victim)
+    return live
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_prefix_index_matches_a_scan(seed):
+    rng = random.Random(seed)
+    index = PrefixIndex(1)
+    live = churn(rng, index, random_contacts(rng, 600))
+    assert len(index) == len(live)
+
+    for prefix in ["", "a", "AN", "ann", "anna", "Bo", "é", "ss", "zz", "SS"]:
+        expected = sorted((c[1].casefold(), c[0]) for c in live.values() if c[1].casefold().startswith(prefix.casefold()))
+        assert index.search(prefix, limit=len(live)) == [cid for _, cid in expected]
+        assert index.search(prefix, limit=5) == [cid for _, cid in expected][:5]
+
+
+def test_prefix_index_rebuild_equals_incremental():
+    rng = random.Random(9)
+    incremental = PrefixIndex(2)
+    live = churn(rng, incremental, random_contacts(rng, 300))
+    rebuilt = PrefixIndex(2)
+    rebuilt.rebuild(live.values())
+    assert rebuilt.entries == incremental.entries
+
+
+def substring_matches(live, text):
+    return sorted(cid for cid, c in live.items() if text.casefold() in c[1].casefold())
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_trigram_index_finds_every_substring_match(seed):
+    rng = random.Random(seed)
+    index = TrigramIndex(1)
+    live = churn(rng, index, random_contacts(rng, 600))
+
+    # Exact substring matches score 1.0 and rank first. One- and
+    # two-character queries (search_short) return only those, lowest IDs first.
+    for query in ["a", "B", "ß", "'", "an", "NN", "ev", "ob", "ann", "bobby", "anna ann", "strasse"]:
+        expected = substring_matches(live, query)
+        results = index.search(query, live, limit=len(live))
+        exact = [cid for cid, score in results if score == 1.0]
+        assert sorted(exact) == expected
+        assert results[:len(exact)] == [(cid, 1.0) for cid in exact]
+        if len(query) < 3:
+            assert exact == expected == [cid for cid, _ in results]
+        assert index.search(query, live, limit=3) == results[:3]
+    assert index.search("  ", live) == []
+
+
+def test_trigram_index_ranks_typos_after_exact_matches():
+    index = TrigramIndex(1)
+    contacts = [Contact(1, "Johnathan", "j@x.org", "Work"), Contact(2, "Jonathan", "k@x.org", "Work"),
+                Contact(3, "Maria", "m@x.org", "Work")]
+    for contact in contacts:
+        index.add(contact)
+    lookup = {c[0]: c for c in contacts}
+    results = index.search("jonathan", lookup)
+    assert [cid for cid, _ in results] == [2, 1]
+    assert results[0][1] == 1.0 and 0.3 <= results[1][1] < 1.0
+
+
+def rebuilt_postings(contacts):
+    index = TrigramIndex(1)
+    index.rebuild(contacts)
+    return index.live_postings()
+
+
+def test_trigram_index_removal_compaction_and_reused_ids():
+    index = TrigramIndex(1)
+    contacts = {i: Contact(i, f"name{i}", f"n{i}@x.org", "Work") for i in range(1, 3001)}
+    for contact in contacts.values():
+        index.add(contact)
+    # Removing more than a quarter of the IDs triggers a compaction.
+    for i in range(1, 1101):
+        index.remove(contacts.pop(i))
+    assert len(index.removed) < 1100
+    assert index.live_postings() == rebuilt_postings(contacts.values())
+
+    # Undo of a delete re-adds the same value; an undone add may reuse the ID
+    # for a different contact, whose old grams must not match any more.
+    index.add(Contact(1100, "name1100", "n@x.org", "Work"))
+    index.remove(contacts.pop(3000))
+    index.add(Contact(3000, "other", "o@x.org", "Work"))
+    contacts[1100] = Contact(1100, "name1100", "n@x.org", "Work")
+    contacts[3000] = Contact(3000, "other", "o@x.org", "Work")
+    assert 3000 not in [cid for cid, _ in index.search("name3000", contacts)]
+    assert [cid for cid, _ in index.search("other", contacts)] == [3000]
+    assert index.search("name1100", contacts)[0] == (1100, 1.0)
+    assert index.live_postings() == rebuilt_postings(contacts.values())
+
+
+def test_search_route(app_state):
+    app = app_state
+    client = app.app.test_client()
+    for name in ["Ann", "anna", "Bob", "Hannah"]:
+        client.post("/add", data={"name": name, "email": f"{name.lower()}@example.com", "category": "Work"})
+
+    def search(**args):
+        return [c[1] for c in client.get("/search", query_string={"format": "json", **args}).get_json()]
+
+    assert search(field="name", prefix="an") == ["Ann", "anna"]
+    assert search(field="name", contains="an") == ["Ann", "anna", "Hannah"]
+    assert search(field="name", contains="nn", limit=1) == ["Ann"]
+    assert search(field="email", prefix="BOB") == ["Bob"]
@@ -0,0 +1,170 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from shared_state import SharedChangeLog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def logs(tmp_path):
+    path = str(tmp_path / "shared.db")
+    # Two workers' views of the same database.
+    opened = [SharedChangeLog(path, checkpoint_ops=3), SharedChangeLog(path, checkpoint_ops=3)]
+    yield opened
+    for log in opened:
+        log.close()
+
+
+def append(log, kind, payload=None):
+    with log.transaction():
+        log.append(kind, payload)
+
+
+def test_readers_see_entries_in_order(logs):
+    writer, reader = logs
+    reader.changed()
+    assert reader.pending_checkpoint() is None
+    assert list(reader.read_new()) == []
+
+    append(writer, "write", [[], 3, 4])
+    append(writer, "undo")
+    assert reader.changed()
+    assert list(reader.read_new()) == [("write", [[], 3, 4]), ("undo", None)]
+    assert not reader.changed()
+    assert list(reader.read_new()) == []
+
+
+def test_rolled_back_transaction_appends_nothing(logs):
+    writer, reader = logs
+    with pytest.raises(RuntimeError):
+        with writer.transaction():
+            writer.append("redo")
+            raise RuntimeError
+    assert list(reader.read_new()) == []
+
+
+def test_change_check_does_not_wait_for_an_open_write(logs):
+    writer, _ = logs
+    writer.changed()
+    inside, release = threading.Event(), threading.Event()
+
+    def slow_write():
+        with writer.transaction():
+            writer.append("undo")
+            inside.set()
+            release.wait(10)
+
+    thread = threading.Thread(target=slow_write)
+    thread.start()
+    try:
+        assert inside.wait(10)
+        checked = threading.Event()
+        threading.Thread(target=lambda: (writer.changed(), writer.load_job("x"), checked.set()), daemon=True).start()
+        assert checked.wait(2)
+    finally:
+        release.set()
+        thread.join()
+    assert writer.changed()
+
+
+def test_checkpoint_compacts_the_log(logs):
+    writer, reader = logs
+    for i in range(4):
+        append(writer, "write", [[], i, i + 1])
+    assert reader.changed()
+    assert [payload[1] for _, payload in reader.read_new()][:2] == [0, 1]
+
+    with writer.transaction():
+        assert writer.checkpoint_due()
+        writer.checkpoint(b"state-4", {"undo": [], "redo": []})
+    for i in range(4, 8):
+        append(writer, "write", [[], i, i + 1])
+    with writer.transaction():
+        assert writer.checkpoint_due()
+        writer.checkpoint(b"state-8", {"undo": [], "redo": []})
+        assert not writer.checkpoint_due()
+
+    # The reader stopped at entry 4; entries up to the previous checkpoint are
+    # gone, so it must load the latest checkpoint and continue after it.
+    assert list(reader.read_new()) == [("write", [[], 4, 5]), ("write", [[], 5, 6]),
+                                       ("write", [[], 6, 7]), ("write", [[], 7, 8])]
+    fresh = SharedChangeLog(writer.path)
+    try:
+        assert fresh.pending_checkpoint() == (b"state-8", {"undo": [], "redo": []})
+        assert list(fresh.read_new()) == []
+    finally:
+        fresh.close()
+
+
+def test_reader_behind_a_truncated_log_reloads(logs):
+    writer, reader = logs
+    append(writer, "write", [[], 0, 1])
+    assert len(list(reader.read_new())) == 1
+    for i in range(1, 8):
+        append(writer, "write", [[], i, i + 1])
+        if i in (3, 6):
+            with writer.transaction():
+                writer.checkpoint(b"state-%d" % i, {"undo": [], "redo": []})
+
+    reader.changed()
+    assert list(reader.read_new()) == []
+    assert reader.changed()
+    assert reader.pending_checkpoint() == (b"state-6", {"undo": [], "redo": []})
+    assert [payload[1] for _, payload in reader.read_new()] == [7]
+
+
+def test_jobs_are_shared(logs):
+    writer, reader = logs
+    for i in range(5):
+        writer.save_job(f"job{i}", float(i), {"id": f"job{i}", "status": "done"}, keep=3)
+    assert reader.load_job("job4") == {"id": "job4", "status": "done"}
+    assert reader.load_job("job0") is None
+
+
+# Another worker process writes through the routes and checkpoints every 5
+# entries; this process starts empty and must converge on the same state.
+WORKER = """
+import json
+import app
+client = app.app.test_client()
+for i in range(11):
+    client.post("/add", data={"name": f"W{i}", "email": f"w{i}@example.com", "category": "Remote", "priority": i % 3})
+client.post("/delete", data={"id": 1})
+client.post("/undo")
+print(json.dumps([sorted(map(list, app.contact_dict.values())), app.next_contact_id, len(app.undo_stack),
+                  len(app.redo_queue), app.shared_log.seq]))
+"""
+
+
+def test_worker_catches_up_from_checkpoint_and_log(app_state, tmp_path):
+    app = app_state
+    path = str(tmp_path / "shared.db")
+    env = dict(os.environ, SHARED_STATE_PATH=path, SHARED_CHECKPOINT_OPS="5")
+    env.pop("CONTACT_STORAGE", None)
+    output = subprocess.run([sys.executable, "-c", WORKER], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True, timeout=120).stdout
+    contacts, next_id, undo_depth, redo_depth, seq = json.loads(output.splitlines()[-1])
+
+    app.shared_log = SharedChangeLog(path, checkpoint_ops=5)
+    try:
+        client = app.app.test_client()
+        client.get("/")
+        assert app.shared_log.checkpoint_seq == 10 and app.shared_log.seq == seq == 13
+        assert sorted(map(list, app.contact_dict.values())) == contacts
+        assert (app.next_contact_id, len(app.undo_stack), len(app.redo_queue)) == (next_id, undo_depth, redo_depth)
+        assert app.check_consistency()
+
+        # Undo history crosses the checkpoint.
+        client.post("/redo")
+        assert 1 not in app.contact_dict
+        client.post("/undo")
+        assert 1 in app.contact_dict
+        assert app.check_consistency()
+    finally:
+        app.shared_log.close()
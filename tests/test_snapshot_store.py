@@ -0,0 +1,134 @@
+import os
+from array import array
+
+import pytest
+
+from snapshot_store import (
+    RECORD, Journal, SnapshotData, SnapshotError, SnapshotStore, encode_snapshot,
+    parse_snapshot, read_snapshot, write_snapshot,
+)
+
+
+def sample_data():
+    return SnapshotData(
+        next_contact_id=6,
+        categories=[("Work", "Contacts"), ("IT", "Work")],
+        category_names=["Work", "IT", "Personal"],
+        ids=array("q", [1, 2, 5]),
+        codes=array("I", [0, 1, 2]),
+        names=["Alice", "Bjørn", "Chloé"],
+        emails=["alice@example.com", "bjorn@example.com", "chloe@example.com"],
+        priorities={2: 7, 5: 1},
+        prefix_orders={1: array("I", [0, 1, 2]), 2: array("I", [0, 1, 2])},
+        trigram_postings={1: {"ali": array("q", [1]), "loé": array("q", [5])}},
+        generation=3,
+    )
+
+
+def assert_same(loaded, data):
+    for field in ("generation", "next_contact_id", "categories", "category_names", "names", "emails",
+                  "priorities"):
+        assert getattr(loaded, field) == getattr(data, field), field
+    assert list(loaded.ids) == list(data.ids)
+    assert list(loaded.codes) == list(data.codes)
+    assert {f: list(o) for f, o in loaded.prefix_orders.items()} == {f: list(o) for f, o in data.prefix_orders.items()}
+    assert ({f: {g: list(ids) for g, ids in p.items()} for f, p in loaded.trigram_postings.items()}
+            == {f: {g: list(ids) for g, ids in p.items()} for f, p in data.trigram_postings.items()})
+
+
+def test_snapshot_file_round_trip(tmp_path):
+    data = sample_data()
+    path = str(tmp_path / "contacts.snap")
+    write_snapshot(path, data)
+    assert_same(read_snapshot(path), data)
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_snapshot_bytes_round_trip():
+    data = sample_data()
+    assert_same(parse_snapshot(memoryview(encode_snapshot(data))), data)
+
+
+def test_missing_snapshot_is_none(tmp_path):
+    assert read_snapshot(str(tmp_path / "contacts.snap")) is None
+
+
+@pytest.mark.parametrize("damage", ["truncate", "flip"])
+def test_damaged_snapshot_is_rejected(damage):
+    blob = bytearray(encode_snapshot(sample_data()))
+    if damage == "truncate":
+        del blob[-5:]
+    else:
+        blob[-1] ^= 0xFF
+    with pytest.raises(SnapshotError):
+        parse_snapshot(memoryview(bytes(blob)))
+
+
+def test_journal_round_trip(tmp_path):
+    path = str(tmp_path / "journal.0.log")
+    journal = Journal(path)
+    payloads = [[[["insert", [i, f"n{i}", "e", "Work"], 0, None]], i + 1] for i in range(5)]
+    for payload in payloads:
+        journal.append(payload)
+    journal.close()
+    assert list(Journal.read(path)) == payloads
+
+
+@pytest.mark.parametrize("cut", [1, RECORD.size - 1, RECORD.size + 3])
+def test_journal_truncated_tail_is_cut_off(tmp_path, cut):
+    path = str(tmp_path / "journal.0.log")
+    journal = Journal(path)
+    journal.append(["first"])
+    journal.append(["second"])
+    journal.close()
+    size = os.path.getsize(path)
+    with open(path, "ab") as f:
+        # A third record that was being written when the process died.
+        f.write((RECORD.pack(20, 0) + b'["third-but-torn"]')[:cut])
+
+    assert list(Journal.read(path)) == [["first"], ["second"]]
+    assert os.path.getsize(path) == size
+
+    journal = Journal(path)
+    journal.append(["third"])
+    journal.close()
+    assert list(Journal.read(path)) == [["first"], ["second"], ["third"]]
+
+
+def test_journal_corrupt_record_ends_the_journal(tmp_path):
+    path = str(tmp_path / "journal.0.log")
+    journal = Journal(path)
+    for payload in (["a"], ["b"], ["c"]):
+        journal.append(payload)
+    journal.close()
+    with open(path, "r+b") as f:
+        data = bytearray(f.read())
+        data[-2] ^= 0xFF
+        f.seek(0)
+        f.write(data)
+    assert list(Journal.read(path)) == [["a"], ["b"]]
+
+
+def test_store_checkpoint_then_journal_replay(tmp_path):
+    directory = str(tmp_path / "snap")
+    store = SnapshotStore(directory, checkpoint_ops=3)
+    assert store.load() is None
+    assert list(store.journal_entries()) == []
+    store.open()
+    assert store.append([["op", 1]], 2) is False
+    store.checkpoint(sample_data, background=False)
+    assert store.append([["op", 2]], 3) is False
+    assert store.append([["op", 3], ["op", 4], ["op", 5]], 4) is True
+    store.close()
+
+    # Journals older than the checkpoint are removed.
+    assert sorted(os.listdir(directory)) == ["contacts.snap", "journal.1.log"]
+
+    reopened = SnapshotStore(directory)
+    data = reopened.load()
+    assert data.generation == 1
+    assert_same(data, SnapshotData(**{**vars(sample_data()), "generation": 1}))
+    assert list(reopened.journal_entries()) == [
+        ([["op", 2]], 3),
+        ([["op", 3], ["op", 4], ["op", 5]], 4),
+    ]
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from sorting import SMALL_RANGE, introsort, sort_contacts
+
+
+def inputs():
+    rng = random.Random(1)
+    n = 2000
+    yield "empty", []
+    yield "single", [1]
+    yield "small", [rng.randrange(10) for _ in range(SMALL_RANGE - 1)]
+    yield "random", [rng.randrange(n) for _ in range(n)]
+    yield "duplicates", [rng.randrange(5) for _ in range(n)]
+    yield "sorted", list(range(n))
+    yield "reversed", list(range(n, 0, -1))
+    yield "equal", [3] * n
+    yield "organ pipe", list(range(n // 2)) + list(range(n // 2, 0, -1))
+    yield "sawtooth", [i % 17 for i in range(n)]
+    yield "floats", [rng.random() for _ in range(n)]
+    yield "strings", ["".join(rng.choices("abcAB", k=3)) for _ in range(n)]
+
+
+CASES = list(inputs())
+
+
+@pytest.mark.parametrize("name,values", CASES, ids=[name for name, _ in CASES])
+@pytest.mark.parametrize("reverse", [False, True])
+def test_introsort_matches_sorted(name, values, reverse):
+    items = list(values)
+    result = introsort(items, reverse=reverse)
+    assert result is items
+    assert items == sorted(values, reverse=reverse)
+
+
+@pytest.mark.parametrize("name,values", CASES, ids=[name for name, _ in CASES])
+@pytest.mark.parametrize("reverse", [False, True])
+def test_stable_key_sort_matches_sorted(name, values, reverse):
+    # Pairs of (key, original position): sorted() is stable, so the
+    # positions show whether ties kept their input order.
+    items = [(str(value).casefold(), i) for i, value in enumerate(values)]
+    key = lambda item: item[0]
+    assert introsort(list(items), key=key, reverse=reverse, stable=True) == sorted(items, key=key, reverse=reverse)
+
+
+def test_adversarial_input_does_not_recurse():
+    # Long input with few distinct keys in a repeating pattern; the sort is
+    # iterative, so it cannot hit the recursion limit.
+    values = [(i * 7919) % 50 for i in range(50000)]
+    assert introsort(list(values)) == sorted(values)
+
+
+@pytest.mark.parametrize("by,key", [
+    ("id", lambda c: c[0]),
+    ("name", lambda c: c[1].casefold()),
+    ("email", lambda c: c[2].casefold()),
+])
+def test_sort_contacts(by, key):
+    rng = random.Random(3)
+    contacts = [[i, rng.choice(["ann", "Bob", "bob", "Cy", "éva"]), f"{rng.randrange(100)}@x.org", "Work"]
+                for i in rng.sample(range(1000), 300)]
+    # Unstable: contacts with equal keys may come out in any order.
+    assert [key(c) for c in sort_contacts(list(contacts), by=by)] == sorted(map(key, contacts))
+    assert (sort_contacts(list(contacts), by=by, stable=True, reverse=True)
+            == sorted(contacts, key=key, reverse=True))
@@ -0,0 +1,95 @@
+import pytest
+
+
+def names(app):
+    return sorted(c[1] for c in app.store.snapshot.records)
+
+
+def add(client, name, priority=0):
+    client.post("/add", data={"name": name, "email": f"{name.lower()}@example.com", "category": "Work",
+                              "priority": priority})
+
+
+def check_journal(app):
+    assert app.journal_bytes == sum(entry.size for entry in (*app.undo_stack, *app.redo_queue))
+    assert app.check_consistency()
+
+
+@pytest.fixture
+def journal_config(app_state):
+    config = app_state.app.config
+    saved = config["UNDO_HISTORY_DEPTH"], config["UNDO_MEMORY_LIMIT"]
+    yield config
+    config["UNDO_HISTORY_DEPTH"], config["UNDO_MEMORY_LIMIT"] = saved
+
+
+def test_undo_and_redo_restore_contacts_ids_and_priorities(app_state):
+    app = app_state
+    client = app.app.test_client()
+    add(client, "Ann")
+    add(client, "Bob", priority=4)
+    bob = app.next_contact_id - 1
+    client.post("/delete", data={"id": bob - 1})
+    assert names(app) == ["Bob"]
+
+    client.post("/undo")
+    assert names(app) == ["Ann", "Bob"]
+    client.post("/undo")
+    assert names(app) == ["Ann"] and not app.vip_priority_map
+    assert app.next_contact_id == bob
+    check_journal(app)
+
+    client.post("/redo")
+    assert names(app) == ["Ann", "Bob"] and app.vip_priority_map == {bob: 4}
+    client.post("/redo")
+    assert names(app) == ["Bob"]
+    # Nothing left to redo: a no-op, not an error.
+    assert client.post("/redo").status_code == 302
+    check_journal(app)
+
+
+def test_new_write_clears_redo(app_state):
+    app = app_state
+    client = app.app.test_client()
+    add(client, "Ann")
+    client.post("/undo")
+    assert len(app.redo_queue) == 1
+    add(client, "Bob")
+    assert not app.redo_queue
+    client.post("/redo")
+    assert names(app) == ["Bob"]
+    check_journal(app)
+
+
+def test_history_depth_drops_the_oldest_entries(app_state, journal_config):
+    app = app_state
+    client = app.app.test_client()
+    journal_config["UNDO_HISTORY_DEPTH"] = 3
+    for i in range(6):
+        add(client, f"N{i}")
+    assert len(app.undo_stack) == 3
+    for _ in range(5):
+        client.post("/undo")
+    assert names(app) == ["N0", "N1", "N2"]
+    check_journal(app)
+
+
+def test_memory_limit_bounds_the_journal(app_state, journal_config):
+    app = app_state
+    client = app.app.test_client()
+    add(client, "Probe")
+    entry_size = app.undo_stack[-1].size
+    journal_config["UNDO_MEMORY_LIMIT"] = entry_size * 4
+    for i in range(10):
+        add(client, f"N{i}")
+    assert app.journal_bytes <= journal_config["UNDO_MEMORY_LIMIT"]
+    assert 1 <= len(app.undo_stack) <= 4
+    check_journal(app)
+
+    # An import larger than the limit is applied but cannot be undone.
+    rows = "".join(f"I{i},i{i}@example.com,Work\n" for i in range(500))
+    summary = client.post("/import", data="name,email,category\n" + rows, content_type="text/csv").get_json()
+    assert summary["imported"] == 500 and not summary["undoable"]
+    assert not app.undo_stack and app.journal_bytes == 0
+    assert len(app.store.snapshot) == 511
+    check_journal(app)